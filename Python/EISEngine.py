@@ -0,0 +1,133 @@
+import csv
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from Python.EIS_final import DeviceCondition, WeightBasedEISCalculator
+
+DEFAULT_MATERIALS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smartPhone.csv")
+
+
+@dataclass(frozen=True, eq=False)
+class MaterialTable:
+    """Materials CSV parsed once into immutable columns."""
+    fingerprint: str
+    elements: Tuple[str, ...]
+    impact_factors: Tuple[float, ...]
+    quantities: Tuple[float, ...]
+    total_mi: float
+    total_weight: float
+
+
+# Parsed tables keyed by (path, mtime, size), so an edited file is re-read
+_tables: Dict[Tuple[str, int, int], MaterialTable] = {}
+
+
+def load_material_table(csv_path: str) -> MaterialTable:
+    """Parse a materials CSV, reusing the cached table while the file is unchanged."""
+    path = os.path.abspath(csv_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    with open(path, mode='rb') as file:
+        raw = file.read()
+    elements, impact_factors, quantities = [], [], []
+    total_mi = 0
+    total_weight = 0
+    # Same row order and accumulation as WeightBasedEISCalculator, so totals match exactly
+    for row in csv.DictReader(raw.decode('utf-8').splitlines()):
+        impact_factor = float(row['Impact Factor (Approx.)'])
+        quantity = float(row['Quantity (gm)'])
+        elements.append(row['Element'])
+        impact_factors.append(impact_factor)
+        quantities.append(quantity)
+        total_mi += impact_factor * quantity
+        total_weight += quantity
+
+    table = MaterialTable(
+        fingerprint=hashlib.sha256(raw).hexdigest(),
+        elements=tuple(elements),
+        impact_factors=tuple(impact_factors),
+        quantities=tuple(quantities),
+        total_mi=total_mi,
+        total_weight=total_weight,
+    )
+    _tables[key] = table
+    return table
+
+
+class EISEngine:
+    """Weight-based EIS scoring with cached material tables and memoised results.
+
+    Scores use the WeightBasedEISCalculator formula,
+    EIS = (total_weight x MI x CA x AF) x RF, and are memoised per
+    (material table fingerprint, DeviceCondition).
+    """
+
+    def __init__(self, default_csv: str = DEFAULT_MATERIALS_CSV,
+                 tables_by_type: Optional[Dict[str, str]] = None, cache_size: int = 4096):
+        self.default_csv = default_csv
+        # Materials CSV per e-waste item type (lower-case); others use default_csv
+        self.tables_by_type = {k.lower(): v for k, v in (tables_by_type or {}).items()}
+        self.cache_size = cache_size
+        self._scores: "OrderedDict[Tuple, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, device_condition: Optional[DeviceCondition] = None, csv_path: Optional[str] = None) -> float:
+        """EIS for one device profile."""
+        table = load_material_table(csv_path or self.default_csv)
+        device_condition = device_condition or DeviceCondition()
+        key = (table.fingerprint, astuple(device_condition))
+
+        eis = self._scores.get(key)
+        if eis is not None:
+            self.hits += 1
+            self._scores.move_to_end(key)
+            return eis
+
+        self.misses += 1
+        factors = WeightBasedEISCalculator(csv_path or self.default_csv, device_condition)
+        ca = factors.calculate_condition_adjustment()
+        af = factors.calculate_age_factor()
+        rf = factors.calculate_recyclability_factor()
+        eis = (table.total_weight * table.total_mi * ca * af) * rf
+
+        self._scores[key] = eis
+        if len(self._scores) > self.cache_size:
+            self._scores.popitem(last=False)
+        return eis
+
+    @staticmethod
+    def condition_for(item, year: Optional[int] = None) -> DeviceCondition:
+        """Device profile for an e-waste item, aged from its manufacture year."""
+        year = year or datetime.now().year
+        return DeviceCondition(age_years=float(max(0, year - item.year)))
+
+    def score_items(self, items: List) -> List[float]:
+        """Score every e-waste item of a transaction in one call."""
+        year = datetime.now().year
+        return [
+            self.score(self.condition_for(item, year), self.tables_by_type.get(item.type.lower()))
+            for item in items
+        ]
+
+    def stats(self) -> Dict:
+        return {"cached_scores": len(self._scores), "hits": self.hits, "misses": self.misses}
+
+
+_engine: Optional[EISEngine] = None
+
+
+def get_engine() -> EISEngine:
+    """Shared engine used by the blockchain."""
+    global _engine
+    if _engine is None:
+        _engine = EISEngine()
+    return _engine
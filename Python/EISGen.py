@@ -1,6 +1,5 @@
 import csv
 from typing import Dict, List, Tuple
-import pandas as pd
 from dataclasses import dataclass
 
 @dataclass
@@ -46,6 +45,10 @@ class DeviceEISCalculator:
 
     def load_materials(self) -> None:
         """Load and validate materials data from CSV file."""
+        # Start from zero so repeated calls do not keep adding to the totals
+        self.materials_data = {}
+        self.total_weight = 0
+        self.total_mi = 0
         try:
             with open(self.csv_path, mode='r') as file:
                 reader = csv.DictReader(file)
@@ -0,0 +1,90 @@
+from typing import Dict
+
+import numpy as np
+
+# Every function here takes per-material inputs either as 1-D arrays of
+# length M (shared by all devices) or as N x M arrays (one row per device),
+# and returns one value per device.
+#
+# Sums over materials are accumulated column by column, in material order,
+# rather than with ndarray.sum(): numpy's pairwise summation rounds
+# differently, whereas this repeats the exact float operations of the
+# scalar calculators, so results are bit-for-bit identical to them.
+
+
+def _columns(n_devices: int, n_materials: int, values) -> np.ndarray:
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (n_devices, n_materials))
+
+
+def _shape(quantities) -> tuple:
+    quantities = np.asarray(quantities, dtype=np.float64)
+    return quantities.shape if quantities.ndim == 2 else (1, quantities.shape[0])
+
+
+def material_totals(impact_factors, quantities) -> Dict[str, np.ndarray]:
+    """Total Material Impact (MI) and total weight per device."""
+    n, m = _shape(quantities)
+    impact = _columns(n, m, impact_factors)
+    quantity = _columns(n, m, quantities)
+
+    total_mi = np.zeros(n)
+    total_weight = np.zeros(n)
+    for j in range(m):
+        total_mi = total_mi + impact[:, j] * quantity[:, j]
+        total_weight = total_weight + quantity[:, j]
+    return {"total_mi": total_mi, "total_weight": total_weight}
+
+
+def device_eis(impact_factors, quantities, conditions, ages, recyclability) -> Dict[str, np.ndarray]:
+    """DeviceEISCalculator (Python/EISGen.py) for N devices x M materials.
+
+    EIS = total_MI x weighted_CA x weighted_AF x (1 - weighted_RF), with
+    AF = max(0.5, 1 - age x 0.05) per material and the weights being each
+    material's share of the device's total weight.
+    """
+    n, m = _shape(quantities)
+    quantity = _columns(n, m, quantities)
+    condition = _columns(n, m, conditions)
+    age_factor = np.maximum(0.5, 1 - (_columns(n, m, ages) * 0.05))
+    recyclable = _columns(n, m, recyclability)
+
+    totals = material_totals(impact_factors, quantity)
+    total_weight = totals["total_weight"]
+
+    weighted_ca = np.zeros(n)
+    weighted_af = np.zeros(n)
+    weighted_rf = np.zeros(n)
+    for j in range(m):
+        weight_fraction = quantity[:, j] / total_weight
+        weighted_ca = weighted_ca + condition[:, j] * weight_fraction
+        weighted_af = weighted_af + age_factor[:, j] * weight_fraction
+        weighted_rf = weighted_rf + recyclable[:, j] * weight_fraction
+
+    eis = totals["total_mi"] * weighted_ca * weighted_af * (1 - weighted_rf)
+    return {
+        "eis": eis,
+        "total_weight": total_weight,
+        "total_material_impact": totals["total_mi"],
+        "condition_adjustment": weighted_ca,
+        "age_factor": weighted_af,
+        "recyclability_factor": weighted_rf,
+    }
+
+
+def weight_based_eis(total_weight, total_mi, condition_rating, age_years,
+                     expected_lifespan, recyclability_percentage) -> Dict[str, np.ndarray]:
+    """WeightBasedEISCalculator (Python/EIS_final.py) for N device profiles.
+
+    EIS = (total_weight x MI x CA x AF) x RF; every argument may be a scalar
+    or an array of length N.
+    """
+    ca = 1 - (np.asarray(condition_rating, dtype=np.float64) / 10)
+    af = np.asarray(age_years, dtype=np.float64) / np.asarray(expected_lifespan, dtype=np.float64)
+    rf = 1 - (np.asarray(recyclability_percentage, dtype=np.float64) / 100)
+    eis = (np.asarray(total_weight, dtype=np.float64) * total_mi * ca * af) * rf
+    return {
+        "environmental_impact_score": eis,
+        "condition_adjustment": ca,
+        "age_factor": af,
+        "recyclability_factor": rf,
+    }
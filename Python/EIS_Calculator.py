@@ -1,91 +1,264 @@
+import argparse
 import csv
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional
 
-def calculate_eis(input_csv, output_csv, material_conditions, material_ages, material_recyclability):
-    """
-    Calculate Material Impact (MI), Condition Adjustment (CA), Age Factor (AF), Recyclability Factor (RF),
-    and Environmental Impact Score (EIS) for materials listed in a CSV file.
-    
-    Parameters:
-        input_csv (str): Path to the input CSV file.
-        output_csv (str): Path to the output CSV file.
-        material_conditions (dict): Condition adjustment factors for materials (e.g., {"Aluminum": 0.8}).
-        material_ages (dict): Age of materials in years (e.g., {"Aluminum": 2}).
-        material_recyclability (dict): Recyclability factors for materials (e.g., {"Aluminum": 0.9}).
-    """
-    results = []
-    
-    # Open and read the input CSV file
-    with open(input_csv, mode="r") as file:
-        reader = csv.DictReader(file)
-        
-        # Process each row in the CSV
-        for row in reader:
-            element = row["Element"]
-            impact_factor = float(row["Impact Factor (Approx.)"])
-            quantity = float(row["Quantity (gm)"])
-            
-            # Calculate Material Impact (MI)
-            mi = impact_factor * quantity
-            
-            # Get Condition Adjustment (CA)
-            ca = material_conditions.get(element, 1.0)  # Default to 1.0 if not provided
-            
-            # Get Age Factor (AF)
-            age = material_ages.get(element, 0)  # Default to 0 years if not provided
-            af = max(0.5, 1 - (age * 0.05))  # Ensure AF is at least 0.5
-            
-            # Get Recyclability Factor (RF)
-            rf = material_recyclability.get(element, 0.5)  # Default to 0.5 if not provided
-            
-            # Calculate Environmental Impact Score (EIS)
-            eis = mi * ca * af * (1 - rf)
-            
-            # Append results
-            results.append({
-                "Element": element,
-                "Impact Factor (Approx.)": impact_factor,
-                "Quantity (gm)": quantity,
-                "Material Impact (MI)": mi,
-                "Condition Adjustment (CA)": ca,
-                "Age Factor (AF)": af,
-                "Recyclability Factor (RF)": rf,
-                "Environmental Impact Score (EIS)": eis
-            })
-    
-    # Write results to output CSV
-    with open(output_csv, mode="w", newline="") as file:
-        fieldnames = ["Element", "Impact Factor (Approx.)", "Quantity (gm)", 
-                      "Material Impact (MI)", "Condition Adjustment (CA)", 
-                      "Age Factor (AF)", "Recyclability Factor (RF)", 
-                      "Environmental Impact Score (EIS)"]
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
-
-# Define input parameters
-input_csv_path = "E:\Code\HackFEST\e-waste\Python\smartPhone.csv"
-output_csv_path = "E:\Code\HackFEST\e-waste\Python\output.csv"
-material_conditions = {
-    "Aluminum": 0.8, "Silicon": 0.9, "Oxygen": 1.0, "Copper": 0.8, 
-    "Iron": 0.9, "Carbon": 0.7, "Nickel": 0.8, "Lithium": 0.6, 
+ROW_FIELDS = ["Element", "Impact Factor (Approx.)", "Quantity (gm)",
+              "Material Impact (MI)", "Condition Adjustment (CA)",
+              "Age Factor (AF)", "Recyclability Factor (RF)",
+              "Environmental Impact Score (EIS)"]
+
+GROUP_FIELDS = ["Total Weight (gm)", "Total Material Impact (MI)",
+                "Condition Adjustment (CA)", "Age Factor (AF)",
+                "Recyclability Factor (RF)", "Environmental Impact Score (EIS)"]
+
+MATERIAL_CONDITIONS = {
+    "Aluminum": 0.8, "Silicon": 0.9, "Oxygen": 1.0, "Copper": 0.8,
+    "Iron": 0.9, "Carbon": 0.7, "Nickel": 0.8, "Lithium": 0.6,
     "Cobalt": 0.6, "Gold": 0.9, "Silver": 0.9, "Tantalum": 0.7,
     "Tin": 0.8, "Neodymium": 0.7, "Palladium": 0.9, "Platinum": 0.9,
     "Yttrium": 0.7, "Indium": 0.6, "Gallium": 0.7
 }
-material_ages = {
+MATERIAL_AGES = {
     "Aluminum": 5, "Silicon": 3, "Oxygen": 0, "Copper": 2,
     "Iron": 4, "Carbon": 3, "Nickel": 6, "Lithium": 1,
     "Cobalt": 2, "Gold": 10, "Silver": 8, "Tantalum": 5,
     "Tin": 4, "Neodymium": 7, "Palladium": 12, "Platinum": 15,
     "Yttrium": 5, "Indium": 6, "Gallium": 3
 }
-material_recyclability = {
-    "Aluminum": 0.9, "Silicon": 0.9, "Oxygen": 1.0, "Copper": 0.85, 
-    "Iron": 0.9, "Carbon": 0.5, "Nickel": 0.8, "Lithium": 0.6, 
+MATERIAL_RECYCLABILITY = {
+    "Aluminum": 0.9, "Silicon": 0.9, "Oxygen": 1.0, "Copper": 0.85,
+    "Iron": 0.9, "Carbon": 0.5, "Nickel": 0.8, "Lithium": 0.6,
     "Cobalt": 0.6, "Gold": 0.95, "Silver": 0.95, "Tantalum": 0.7,
     "Tin": 0.85, "Neodymium": 0.6, "Palladium": 0.9, "Platinum": 0.95,
     "Yttrium": 0.6, "Indium": 0.5, "Gallium": 0.6
 }
 
-# Call the function
-calculate_eis(input_csv_path, output_csv_path, material_conditions, material_ages, material_recyclability)
+
+def score_row(row: Dict, material_conditions: Dict, material_ages: Dict, material_recyclability: Dict) -> Dict:
+    """Calculate MI, CA, AF, RF and EIS for a single material row."""
+    element = row["Element"]
+    impact_factor = float(row["Impact Factor (Approx.)"])
+    quantity = float(row["Quantity (gm)"])
+
+    # Calculate Material Impact (MI)
+    mi = impact_factor * quantity
+
+    # Get Condition Adjustment (CA)
+    ca = material_conditions.get(element, 1.0)  # Default to 1.0 if not provided
+
+    # Get Age Factor (AF)
+    age = material_ages.get(element, 0)  # Default to 0 years if not provided
+    af = max(0.5, 1 - (age * 0.05))  # Ensure AF is at least 0.5
+
+    # Get Recyclability Factor (RF)
+    rf = material_recyclability.get(element, 0.5)  # Default to 0.5 if not provided
+
+    # Calculate Environmental Impact Score (EIS)
+    eis = mi * ca * af * (1 - rf)
+
+    return {
+        "Element": element,
+        "Impact Factor (Approx.)": impact_factor,
+        "Quantity (gm)": quantity,
+        "Material Impact (MI)": mi,
+        "Condition Adjustment (CA)": ca,
+        "Age Factor (AF)": af,
+        "Recyclability Factor (RF)": rf,
+        "Environmental Impact Score (EIS)": eis
+    }
+
+
+def score_group(rows: List[Dict], material_conditions: Dict, material_ages: Dict, material_recyclability: Dict) -> Dict:
+    """Calculate a device-level EIS from all of its material rows.
+
+    Uses the same weighted formula as DeviceEISCalculator:
+    EIS = total_MI x weighted_CA x weighted_AF x (1 - weighted_RF).
+    """
+    total_weight = 0
+    total_mi = 0
+    for row in rows:
+        quantity = float(row["Quantity (gm)"])
+        total_weight += quantity
+        total_mi += float(row["Impact Factor (Approx.)"]) * quantity
+
+    weighted_ca = 0
+    weighted_af = 0
+    weighted_rf = 0
+    for row in rows:
+        element = row["Element"]
+        weight_fraction = float(row["Quantity (gm)"]) / total_weight
+        af = max(0.5, 1 - (material_ages.get(element, 0) * 0.05))
+        weighted_ca += material_conditions.get(element, 1.0) * weight_fraction
+        weighted_af += af * weight_fraction
+        weighted_rf += material_recyclability.get(element, 0.5) * weight_fraction
+
+    return {
+        "Total Weight (gm)": total_weight,
+        "Total Material Impact (MI)": total_mi,
+        "Condition Adjustment (CA)": weighted_ca,
+        "Age Factor (AF)": weighted_af,
+        "Recyclability Factor (RF)": weighted_rf,
+        "Environmental Impact Score (EIS)": total_mi * weighted_ca * weighted_af * (1 - weighted_rf),
+    }
+
+
+def process_chunk(rows: List[Dict], group_by: Optional[str], material_conditions: Dict,
+                  material_ages: Dict, material_recyclability: Dict) -> List[Dict]:
+    """Score one chunk of input rows, per row or per device group."""
+    if group_by is None:
+        return [score_row(row, material_conditions, material_ages, material_recyclability) for row in rows]
+    return [
+        {group_by: key, **score_group(list(group), material_conditions, material_ages, material_recyclability)}
+        for key, group in groupby(rows, key=lambda row: row[group_by])
+    ]
+
+
+def read_chunks(reader: Iterator[Dict], chunk_size: int, group_by: Optional[str]) -> Iterator[List[Dict]]:
+    """Yield lists of about chunk_size rows, never splitting a device group.
+
+    Group mode expects each device's rows to be contiguous in the input.
+    """
+    chunk = []
+    for row in reader:
+        if len(chunk) >= chunk_size and (group_by is None or row[group_by] != chunk[-1][group_by]):
+            yield chunk
+            chunk = []
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+class CsvOutput:
+    def __init__(self, path: str, fieldnames: List[str]):
+        self.file = open(path, mode="w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write(self, rows: List[Dict]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    """Writes each chunk as a Parquet row group (requires pyarrow)."""
+
+    def __init__(self, path: str, fieldnames: List[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.fieldnames = fieldnames
+        string_fields = {"Element"} | {f for f in fieldnames if f not in ROW_FIELDS + GROUP_FIELDS}
+        self.schema = pa.schema([
+            (name, pa.string() if name in string_fields else pa.float64()) for name in fieldnames
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[Dict]):
+        columns = {name: [row[name] for row in rows] for name in self.fieldnames}
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def calculate_eis(input_csv, output_csv, material_conditions, material_ages, material_recyclability,
+                  group_by: Optional[str] = None, output_format: str = "csv", chunk_size: int = 50_000,
+                  workers: int = 1, progress: bool = False) -> int:
+    """
+    Calculate Material Impact (MI), Condition Adjustment (CA), Age Factor (AF), Recyclability Factor (RF),
+    and Environmental Impact Score (EIS) for materials listed in a CSV file.
+
+    The input is streamed in chunks and results are written as each chunk
+    finishes, so memory use does not grow with the file size.
+
+    Parameters:
+        input_csv (str): Path to the input CSV file.
+        output_csv (str): Path to the output file.
+        material_conditions (dict): Condition adjustment factors for materials (e.g., {"Aluminum": 0.8}).
+        material_ages (dict): Age of materials in years (e.g., {"Aluminum": 2}).
+        material_recyclability (dict): Recyclability factors for materials (e.g., {"Aluminum": 0.9}).
+        group_by (str): Column identifying a device; if given, one EIS is written per device.
+        output_format (str): "csv" or "parquet".
+        chunk_size (int): Rows per chunk.
+        workers (int): Processes scoring chunks in parallel.
+        progress (bool): Report rows/sec on stderr.
+
+    Returns:
+        int: Number of input rows processed.
+    """
+    fieldnames = [group_by] + GROUP_FIELDS if group_by else ROW_FIELDS
+    output = (ParquetOutput if output_format == "parquet" else CsvOutput)(output_csv, fieldnames)
+    factors = (group_by, material_conditions, material_ages, material_recyclability)
+
+    rows_done = 0
+    start = last_report = time.perf_counter()
+
+    def report(final=False):
+        nonlocal last_report
+        now = time.perf_counter()
+        if progress and (final or now - last_report >= 1.0):
+            last_report = now
+            elapsed = now - start
+            print(f"{rows_done:,} rows, {rows_done / elapsed if elapsed else 0:,.0f} rows/sec",
+                  file=sys.stderr)
+
+    try:
+        with open(input_csv, mode="r", newline="") as file:
+            chunks = read_chunks(csv.DictReader(file), chunk_size, group_by)
+            if workers <= 1:
+                for chunk in chunks:
+                    output.write(process_chunk(chunk, *factors))
+                    rows_done += len(chunk)
+                    report()
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # Keep a bounded number of chunks in flight and write them in input order
+                    in_flight = []
+                    for chunk in chunks:
+                        in_flight.append((len(chunk), executor.submit(process_chunk, chunk, *factors)))
+                        if len(in_flight) >= workers * 2:
+                            size, future = in_flight.pop(0)
+                            output.write(future.result())
+                            rows_done += size
+                            report()
+                    for size, future in in_flight:
+                        output.write(future.result())
+                        rows_done += size
+                        report()
+    finally:
+        output.close()
+    report(final=True)
+    return rows_done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a materials CSV and write EIS per row or per device.")
+    parser.add_argument("input_csv", help="Input CSV with Element, Impact Factor (Approx.) and Quantity (gm) columns")
+    parser.add_argument("output", help="Output file")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--group-by", help="Column identifying a device (rows of one device must be contiguous)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress")
+    args = parser.parse_args(argv)
+
+    calculate_eis(
+        args.input_csv, args.output,
+        MATERIAL_CONDITIONS, MATERIAL_AGES, MATERIAL_RECYCLABILITY,
+        group_by=args.group_by, output_format=args.format, chunk_size=args.chunk_size,
+        workers=args.workers, progress=not args.quiet,
+    )
+
+
+# Usage: python EIS_Calculator.py smartPhone.csv output.csv [--group-by "Device ID"] [--workers 4]
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,10 @@ class WeightBasedEISCalculator:
 
     def calculate_material_impact_and_weight(self) -> Tuple[float, float]:
         """Calculate total Material Impact (MI) and total weight from material data."""
+        # Start from zero so repeated calls do not keep adding to the totals
+        self.materials_data = {}
+        self.total_mi = 0
+        self.total_weight = 0
         try:
             with open(self.csv_path, mode='r') as file:
                 reader = csv.DictReader(file)
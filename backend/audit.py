@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import asyncpg
+
+COLUMNS = ("email", "success", "error_message", "token", "timestamp")
+
+
+class LoginAuditLog:
+    """Write-behind buffer for login_logs.
+
+    Request handlers only queue an event; a background task copies queued
+    events into Postgres with COPY, once batch_size have accumulated or
+    flush_interval seconds after the first one arrived. The queue is bounded:
+    when it is full new events are dropped and counted rather than slowing
+    logins down.
+    """
+
+    def __init__(self, max_pending: int = 10_000, batch_size: int = 500, flush_interval: float = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "asyncio.Queue[Tuple]" = asyncio.Queue(maxsize=max_pending)
+        # Events taken off the queue but not written yet, kept if the writer is cancelled
+        self._batch: List[Tuple] = []
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def record(self, email: str, success: bool, token: Optional[str], error_message: Optional[str] = None):
+        """Queue a login attempt, timestamped now."""
+        try:
+            self._queue.put_nowait((email, success, error_message, token, datetime.now(timezone.utc)))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _write(self, pool: asyncpg.Pool):
+        """Copy the current batch into login_logs."""
+        if not self._batch:
+            return
+        try:
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table("login_logs", records=self._batch, columns=COLUMNS)
+            self.flushed += len(self._batch)
+            self.flushes += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += len(self._batch)
+            print(f"Failed to write {len(self._batch)} login audit events: {e}")
+        self._batch = []
+
+    async def run(self, pool: asyncpg.Pool):
+        """Flush queued events in batches until cancelled."""
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(pool)
+
+    async def drain(self, pool: asyncpg.Pool):
+        """Write every event still queued; call after cancelling run() on shutdown."""
+        while self._batch or not self._queue.empty():
+            while len(self._batch) < self.batch_size and not self._queue.empty():
+                self._batch.append(self._queue.get_nowait())
+            await self._write(pool)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() + len(self._batch),
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+login_audit = LoginAuditLog(
+    max_pending=int(os.getenv("LOGIN_AUDIT_MAX_PENDING", "10000")),
+    batch_size=int(os.getenv("LOGIN_AUDIT_BATCH_SIZE", "500")),
+    flush_interval=int(os.getenv("LOGIN_AUDIT_FLUSH_MS", "500")) / 1000,
+)
@@ -1,86 +1,108 @@
+import asyncio
 import asyncpg
 import os
-import re
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException
 
 
-async def open_connection():
-    """Establish and return a connection to the database."""
-    try:
-        # Connect to the default PostgreSQL database
-        conn = await asyncpg.connect(
+# Shared connection pool, created once by the FastAPI lifespan
+_pool: Optional[asyncpg.Pool] = None
+
+# Running totals used to report how long handlers waited for a connection
+_acquire_stats = {
+    "acquired": 0,
+    "timeouts": 0,
+    "total_wait": 0.0,
+    "max_wait": 0.0,
+}
+
+
+async def create_pool() -> asyncpg.Pool:
+    """Create the shared connection pool used by every request handler."""
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
             user=os.getenv("POSTGRES_USER"),
             password=os.getenv("POSTGRES_PASS"),
-            database="UserLog",
+            database=os.getenv("POSTGRES_DB", "UserLog"),
             host=os.getenv("POSTGRES_HOST", "localhost"),
             port=os.getenv("POSTGRES_PORT", "5432"),
+            min_size=int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+            max_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+            statement_cache_size=int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100")),
         )
+        print(f"Database pool created (min={_pool.get_min_size()}, max={_pool.get_max_size()}).")
+    return _pool
 
-        # Default database name
-        dataname = os.getenv("POSTGRES_DB", "UserLog")
 
-        # Check if the database already exists
-        exists = await conn.fetchval(
-            "SELECT 1 FROM pg_catalog.pg_database WHERE datname = $1;",
-            dataname,
-        )
+async def close_pool():
+    """Close the shared connection pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        print("Database pool closed.")
+
+
+def get_pool() -> asyncpg.Pool:
+    """Return the shared pool, failing if the app has not started it."""
+    if _pool is None:
+        raise RuntimeError("Database pool is not initialised; call create_pool() first.")
+    return _pool
+
+
+@asynccontextmanager
+async def pooled_connection():
+    """Borrow a pooled connection for a block of queries.
+
+    Waits at most POSTGRES_POOL_ACQUIRE_TIMEOUT seconds, then fails with 503.
+    """
+    pool = get_pool()
+    timeout = float(os.getenv("POSTGRES_POOL_ACQUIRE_TIMEOUT", "5"))
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=timeout)
+    except asyncio.TimeoutError:
+        _acquire_stats["timeouts"] += 1
+        raise HTTPException(status_code=503, detail="Database is busy, try again later")
+
+    waited = time.perf_counter() - start
+    _acquire_stats["acquired"] += 1
+    _acquire_stats["total_wait"] += waited
+    _acquire_stats["max_wait"] = max(_acquire_stats["max_wait"], waited)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+async def get_connection():
+    """FastAPI dependency yielding a pooled connection for the request."""
+    async with pooled_connection() as conn:
+        yield conn
+
 
-        if not exists:
-            print(f"Database '{dataname}' does not exist. Creating it now...")
-            
-            # Collect user input for new database and user credentials
-            user = input("Enter username for new database user: ").strip()
-            while not re.match(r"^[a-zA-Z0-9_]+$", user):
-                print("Invalid username. Use only letters, numbers, and underscores.")
-                user = input("Enter username for new database user: ").strip()
-
-            password = input("Enter password for the user: ").strip()
-            if not password:
-                raise ValueError("Password cannot be empty.")
-
-            db_name = input("Enter a name for the new database: ").strip()
-            while not re.match(r"^[a-zA-Z0-9_]+$", db_name) or len(db_name) < 3:
-                print("Invalid database name. Use only letters, numbers, and underscores, with at least 3 characters.")
-                db_name = input("Enter a name for the new database: ").strip()
-
-            # Create the new user, database, and grant privileges
-            await conn.execute(f'CREATE DATABASE "{db_name}";')
-            await conn.execute(f"CREATE USER {user} WITH PASSWORD $1;", password)
-            await conn.execute(f"GRANT ALL PRIVILEGES ON DATABASE \"{db_name}\" TO {user};")
-            
-            print(f"Database '{db_name}' and user '{user}' created successfully.")
-
-            # Close initial connection and reconnect to the new database
-            await conn.close()
-            conn = await asyncpg.connect(
-                user=user,
-                password=password,
-                database=db_name,
-                host=os.getenv("POSTGRES_HOST", "localhost"),
-                port=os.getenv("POSTGRES_PORT", "5432"),
-            )
-        else:
-            print(f"Database '{dataname}' already exists. Connecting...")
-            conn = await asyncpg.connect(
-                
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASS"),
-                database=dataname,
-                host=os.getenv("POSTGRES_HOST", "localhost"),
-                port=os.getenv("POSTGRES_PORT", "5432"),
-            )
-
-        # Confirm connection by fetching PostgreSQL version
-        version = await conn.fetchval("SELECT version();")
-        print(f"Connected to the database. PostgreSQL Version: {version}")
-        return conn
-
-    except Exception as e:
-        print(f"Error connecting to the database: {e}")
-        return None
-
-
-async def close_connection(conn):
-    """Close the database connection."""
-    if conn:
-        await conn.close()
-        print("Database connection closed.")
+def pool_stats() -> dict:
+    """Return pool usage figures for monitoring."""
+    acquired = _acquire_stats["acquired"]
+    stats = {
+        "acquired": acquired,
+        "acquire_timeouts": _acquire_stats["timeouts"],
+        "avg_wait_ms": (_acquire_stats["total_wait"] / acquired * 1000) if acquired else 0.0,
+        "max_wait_ms": _acquire_stats["max_wait"] * 1000,
+    }
+    if _pool is None:
+        stats.update({"size": 0, "in_use": 0, "idle": 0})
+    else:
+        size = _pool.get_size()
+        idle = _pool.get_idle_size()
+        stats.update({
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "min_size": _pool.get_min_size(),
+            "max_size": _pool.get_max_size(),
+        })
+    return stats
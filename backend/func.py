@@ -1,45 +1,31 @@
 from typing import Optional
 from fastapi import HTTPException, Request , Header
-from .db import open_connection, close_connection
 from datetime import datetime, timedelta, timezone
 import jwt
 import hashlib
 import json
 from asyncpg import Connection
+from uuid import uuid4
+from .revocation import revocation_cache
+from .audit import login_audit
 
 
 # Function to log login attempts
-async def log_login_attempt(conn, username: str, success: bool, token ,error_message: Optional[str] = None):
-    """Log the login attempt to the 'login_logs' table."""
-    try:
-        await conn.execute("DROP TABLE login_logs;")
-        # Ensure that the login_logs table exists
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS login_logs (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) NOT NULL,
-                success BOOLEAN NOT NULL,
-                error_message TEXT,
-                timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                token TEXT
-            );
-            """
-        )
-        
-        # Insert the login attempt into the login_logs table
-        await conn.execute(
-            """
-            INSERT INTO login_logs (email, success, error_message, token)
-            VALUES ($1, $2, $3, $4);
-            """,
-            username, success, error_message, token
-        )
-        print(f"Login attempt for user '{username}' logged successfully.")
-    except Exception as e:
-        print(f"Failed to log login attempt for '{username}': {e}")
+def log_login_attempt(username: str, success: bool, token, error_message: Optional[str] = None):
+    """Queue the login attempt for the 'login_logs' table.
+
+    The row is written in the background by login_audit, so the request
+    does not wait for the INSERT.
+    """
+    login_audit.record(username, success, token, error_message)
 
-async def verify_jwt_token(authorization: str) -> int:
+def verify_jwt_token(authorization: str, SECRET_KEY, ALGORITHM) -> dict:
+    """Verify a bearer token locally and return its payload.
+
+    The signature and expiry are checked with the server's key, and the
+    token id is looked up in the in-process revocation cache, so no
+    database round-trip is needed.
+    """
     # Check if the Authorization header exists
     if not authorization:
         raise HTTPException(
@@ -55,24 +41,18 @@ async def verify_jwt_token(authorization: str) -> int:
     # Extract the token from the header
     token = authorization[len("Bearer "):]
     
-    # Connect to the database and check the token
-    conn: Connection = await open_connection()
     try:
-        query = "SELECT id FROM login_logs WHERE token = $1"
-        result = await conn.fetchrow(query, token)
-        
-        if result:
-            return result["id"]
-        else:
-            raise HTTPException(
-                status_code=401, detail="Invalid or expired token"
-            )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error verifying token: {str(e)}"
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "email"]}
         )
-    finally:
-        await close_connection(conn)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    if revocation_cache.is_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
 
 
 # Helper function to generate JWT token
@@ -85,6 +65,7 @@ def create_jwt_token(email: str, SECRET_KEY, ALGORITHM):
         "email": email,
         "exp": exp,  # Must be a UTC datetime
         "iat": now,  # Must also be UTC
+        "jti": uuid4().hex,  # Token id, used for revocation
     }
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token, exp
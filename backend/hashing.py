@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from fastapi import HTTPException
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a small, bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    here. Once max_pending calls are queued or running, new calls are
+    rejected with a 503 instead of piling up behind the workers.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, rounds: int = 12):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, try again later")
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - start
+            self.completed += 1
+            self.total_latency += elapsed
+            self.max_latency = max(self.max_latency, elapsed)
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _check(password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured bcrypt cost."""
+        return await self._submit(self._hash, password)
+
+    async def check(self, password: str, hashed: str) -> bool:
+        """Check a password against a stored bcrypt hash."""
+        return await self._submit(self._check, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "in_flight": min(self._pending, self.workers),
+            "queue_length": max(0, self._pending - self.workers),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_ms": (self.total_latency / self.completed * 1000) if self.completed else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("BCRYPT_WORKERS", "4")),
+    max_pending=int(os.getenv("BCRYPT_MAX_PENDING", "64")),
+    rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+)
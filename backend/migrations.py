@@ -0,0 +1,112 @@
+import asyncio
+import asyncpg
+import os
+from typing import List, Tuple
+
+
+# Ordered list of (version, description, SQL). Append new entries only;
+# never edit a migration that has already been applied somewhere.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (
+        1,
+        "create users and login_logs tables",
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            password VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            DOB VARCHAR(255) NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS login_logs (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(255) NOT NULL,
+            success BOOLEAN NOT NULL,
+            error_message TEXT,
+            timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            token TEXT
+        );
+        """,
+    ),
+    (
+        2,
+        "index users.email, login_logs.token and login_logs(email, timestamp)",
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email);
+        CREATE INDEX IF NOT EXISTS login_logs_token_idx ON login_logs (token);
+        CREATE INDEX IF NOT EXISTS login_logs_email_timestamp_idx ON login_logs (email, timestamp);
+        """,
+    ),
+    (
+        3,
+        "create revoked_tokens table",
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            email VARCHAR(255) NOT NULL,
+            revoked_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMPTZ NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS revoked_tokens_revoked_at_idx ON revoked_tokens (revoked_at);
+        """,
+    ),
+]
+
+# Arbitrary key so concurrent workers starting together migrate one at a time
+MIGRATION_LOCK_ID = 720_411
+
+
+async def migrate(conn: asyncpg.Connection) -> List[int]:
+    """Apply every pending migration and return the versions applied."""
+    applied = []
+    await conn.execute("SELECT pg_advisory_lock($1);", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+        current = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+
+        for version, description, sql in MIGRATIONS:
+            if version <= current:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES ($1, $2);",
+                    version, description,
+                )
+            applied.append(version)
+            print(f"Applied migration {version}: {description}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1);", MIGRATION_LOCK_ID)
+    return applied
+
+
+async def main():
+    """Run migrations against the database configured in the environment."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    conn = await asyncpg.connect(
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASS"),
+        database=os.getenv("POSTGRES_DB", "UserLog"),
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=os.getenv("POSTGRES_PORT", "5432"),
+    )
+    try:
+        applied = await migrate(conn)
+        if not applied:
+            print("Database schema is up to date.")
+    finally:
+        await conn.close()
+
+
+# Usage: python -m backend.migrations
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncpg
+
+
+class RevocationCache:
+    """In-process set of revoked token ids (jti), mirrored from Postgres.
+
+    Entries are dropped once the token they refer to has expired, since an
+    expired token is rejected by signature verification anyway. The cache is
+    bounded: when full the entry closest to expiry is evicted first, so
+    max_size should exceed the number of revocations expected within one
+    token lifetime.
+
+    revoked_at is the start time of the revoking transaction, so a row can
+    commit after a refresh with a revoked_at before that refresh's
+    watermark. Each refresh therefore re-reads the last overlap seconds;
+    adding a jti twice is harmless.
+    """
+
+    def __init__(self, max_size: int = 100_000, refresh_interval: float = 5.0, overlap: float = 30.0):
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self._entries: Dict[str, float] = {}  # jti -> expiry (epoch seconds)
+        # (expiry, jti) min-heap for eviction; entries no longer in _entries
+        # with that expiry are skipped when popped
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._last_revoked_at: Optional[datetime] = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, jti: str, expires_at: float):
+        """Mark a token id as revoked until its expiry time."""
+        if expires_at <= time.time() or self._entries.get(jti) == expires_at:
+            return
+        self._entries[jti] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, jti))
+        while len(self._entries) > self.max_size:
+            self._pop_soonest()
+
+    def _pop_soonest(self):
+        """Drop the entry closest to expiry."""
+        while self._expiry_heap:
+            expires_at, jti = heapq.heappop(self._expiry_heap)
+            if self._entries.get(jti) == expires_at:
+                del self._entries[jti]
+                return
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Check a token id against the local revocation set."""
+        if jti is None:
+            return False
+        expires_at = self._entries.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._entries[jti]
+            return False
+        return True
+
+    def evict_expired(self):
+        """Drop entries whose tokens have already expired."""
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, jti = heapq.heappop(self._expiry_heap)
+            if self._entries.get(jti) == expires_at:
+                del self._entries[jti]
+
+    async def refresh(self, pool: asyncpg.Pool):
+        """Pull revocations recorded since the last refresh, less the overlap window."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT jti, expires_at, revoked_at FROM revoked_tokens
+                WHERE expires_at > now()
+                  AND ($1::timestamptz IS NULL OR revoked_at > $1 - make_interval(secs => $2))
+                ORDER BY revoked_at;
+                """,
+                self._last_revoked_at, self.overlap,
+            )
+        for row in rows:
+            self.add(row["jti"], row["expires_at"].timestamp())
+            self._last_revoked_at = max(self._last_revoked_at or row["revoked_at"], row["revoked_at"])
+        self.evict_expired()
+        self.refreshes += 1
+
+    async def run(self, pool: asyncpg.Pool):
+        """Keep the cache in sync with Postgres until cancelled."""
+        while True:
+            try:
+                await self.refresh(pool)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"Failed to refresh token revocations: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def revoke(self, conn: asyncpg.Connection, jti: str, email: str, expires_at: datetime):
+        """Record a revocation in Postgres and apply it locally right away."""
+        await conn.execute(
+            """
+            INSERT INTO revoked_tokens (jti, email, expires_at)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (jti) DO NOTHING;
+            """,
+            jti, email, expires_at,
+        )
+        self.add(jti, expires_at.timestamp())
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._entries),
+            "max_size": self.max_size,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+revocation_cache = RevocationCache(
+    max_size=int(os.getenv("REVOCATION_CACHE_SIZE", "100000")),
+    refresh_interval=float(os.getenv("REVOCATION_REFRESH_INTERVAL", "5")),
+    overlap=float(os.getenv("REVOCATION_REFRESH_OVERLAP", "30")),
+)
@@ -1,27 +1,115 @@
-from backend.db import open_connection, close_connection
+from backend.db import create_pool, close_pool, pooled_connection, pool_stats
+from backend.migrations import migrate
 from backend.func import log_login_attempt, create_jwt_token, verify_jwt_token
-from pydantic import BaseModel
-import bcrypt
-from fastapi import FastAPI, HTTPException, Depends, Response
-from fastapi.responses import JSONResponse
+from backend.revocation import revocation_cache
+from backend.audit import login_audit
+from backend.hashing import password_hasher
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from fastapi import FastAPI, HTTPException, Response, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
 import os
 from backend.models import UserLoginCred, UserSignUpCred, UserLog
 from blockchain.blockchain import RecycleChain, TransactionModel, EWasteStatus, EWasteItem, TokenSystem
+from blockchain.blockchain_db import BlockStore
+from blockchain.mempool import Mempool, MempoolFull
 from .models import UserLoginCred, UserSignUpCred, UserLog
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from typing import Optional, List
+from contextlib import asynccontextmanager
+import asyncio
+from asyncpg import UniqueViolationError
 
 
 load_dotenv()
 # Secret key for JWT (use a more secure method in production)
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
-
-app = FastAPI()
-recycle = RecycleChain()
-token_system = TokenSystem() 
+# Blocks read from the chain at a time when streaming /chain
+STREAM_PAGE_SIZE = 500
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared database pool once for the lifetime of the app
+    pool = await create_pool()
+    # Bring the schema up to date once, so request handlers only run DML
+    if os.getenv("RUN_MIGRATIONS", "1") == "1":
+        async with pool.acquire() as conn:
+            await migrate(conn)
+    # Keep the local token revocation set in sync in the background
+    await revocation_cache.refresh(pool)
+    revocation_task = asyncio.create_task(revocation_cache.run(pool))
+    # Write login audit events in batches, off the request path
+    audit_task = asyncio.create_task(login_audit.run(pool))
+    # Mine accepted token transfers in batches in the background
+    miner_task = asyncio.create_task(token_system.run_miner())
+    # Seal e-waste transactions into blocks by size or age
+    sealer_task = asyncio.create_task(recycle.run_sealer(
+        os.getenv("MINER_ADDRESS", "node"),
+        max_transactions=recycle.max_block_transactions,
+        interval=float(os.getenv("BLOCK_INTERVAL", "30")),
+    ))
+    # fsync the tail of an append burst once the store's interval has passed
+    sync_tasks = [
+        asyncio.create_task(store.run_syncer())
+        for store in (recycle.store, token_system.store) if store is not None
+    ]
+    # Mirror sealed blocks into MongoDB for analytics when it is configured
+    app.state.mongo_mirror = None
+    if os.getenv("MONGO_URI"):
+        from blockchain.mongo_db import MongoMirror, get_database
+        app.state.mongo_mirror = MongoMirror(
+            get_database(),
+            batch_size=int(os.getenv("MONGO_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("MONGO_FLUSH_INTERVAL", "1.0")),
+        )
+        # Returns at once; indexes and the backfill are handled by the writer thread
+        app.state.mongo_mirror.start(recycle)
+    try:
+        yield
+    finally:
+        sealer_task.cancel()
+        miner_task.cancel()
+        revocation_task.cancel()
+        audit_task.cancel()
+        for task in sync_tasks:
+            task.cancel()
+        recycle.miner.shutdown()
+        for store in (recycle.store, token_system.store):
+            if store is not None:
+                store.close()
+        password_hasher.shutdown()
+        if app.state.mongo_mirror is not None:
+            await asyncio.to_thread(app.state.mongo_mirror.stop)
+        # Write out queued login audit events before the pool closes
+        await asyncio.gather(audit_task, return_exceptions=True)
+        await login_audit.drain(pool)
+        await close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+# Keep the ledger on disk when a data directory is configured
+CHAIN_DATA_DIR = os.getenv("CHAIN_DATA_DIR")
+recycle = RecycleChain(
+    difficulty=int(os.getenv("CHAIN_POW_DIFFICULTY", "4")),
+    mining_workers=int(os.getenv("MINING_WORKERS", "0")) or None,
+    store=BlockStore(os.path.join(CHAIN_DATA_DIR, "chain")) if CHAIN_DATA_DIR else None,
+    mempool=Mempool(
+        max_transactions=int(os.getenv("MEMPOOL_MAX_TRANSACTIONS", "10000")),
+        max_bytes=int(os.getenv("MEMPOOL_MAX_BYTES", str(16 * 1024 * 1024))),
+    ),
+    max_block_transactions=int(os.getenv("BLOCK_MAX_TRANSACTIONS", "500")),
+)
+token_system = TokenSystem(
+    difficulty=int(os.getenv("TOKEN_POW_DIFFICULTY", "4")),
+    max_batch_size=int(os.getenv("TOKEN_BATCH_SIZE", "500")),
+    recipient_lock_seconds=float(os.getenv("TOKEN_RECIPIENT_LOCK_SECONDS", "5")),
+    store=BlockStore(os.path.join(CHAIN_DATA_DIR, "tokens")) if CHAIN_DATA_DIR else None,
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,7 +119,11 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
 )
+# Compress large responses (e.g. /chain) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 # Pydantic models for request/response validation
+transaction_adapter = TypeAdapter(TransactionModel)
+
 class NodeRegistration(BaseModel):
     address: str
 
@@ -72,18 +164,18 @@ async def read_root():
 
 @app.post("/login")
 async def login(cred: UserLoginCred, response: Response):
-    # Get the database connection
-    conn = await open_connection()
     try:
-        # Query to get user from the database
+        # Query to get user from the database; the connection goes back to
+        # the pool before the password check waits for a bcrypt worker
         query = "SELECT id,password FROM users WHERE email = $1"
-        result = await conn.fetchrow(query, cred.email)
+        async with pooled_connection() as conn:
+            result = await conn.fetchrow(query, cred.email)
         print(result)
         if result:
             # Compare the stored hashed password with the input password
             stored_password_hash = result['password']
             user_id = result['id']
-            if bcrypt.checkpw(cred.password.encode('utf-8'), stored_password_hash.encode('utf-8')):
+            if await password_hasher.check(cred.password, stored_password_hash):
                 # Generate JWT token for the user
                 token, valid_to = create_jwt_token(cred.email, SECRET_KEY=SECRET_KEY, ALGORITHM=ALGORITHM)
                 
@@ -99,7 +191,7 @@ async def login(cred: UserLoginCred, response: Response):
                 )
 
                 # Log the successful login attempt
-                await log_login_attempt(conn, cred.email, success=True, token=token)
+                log_login_attempt(cred.email, success=True, token=token)
                  
                 # walletId = create_wallet() 
 
@@ -112,67 +204,56 @@ async def login(cred: UserLoginCred, response: Response):
         else:
             # Log the failed login attempt
             raise HTTPException(status_code=404, detail="User not found")
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error in case of an exception
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        # Close the database connection
-        await close_connection(conn)
 
 @app.post("/signup")
 async def signup(cred: UserSignUpCred):
-    # Get the database connection
-    conn = await open_connection()
     try:
-        
         # Check if user already exists
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                password VARCHAR(255) NOT NULL,
-                email VARCHAR(255) NOT NULL,
-                DOB VARCHAR(255) NOT NULL
-            );
-            """
-        )
-        
         query = "SELECT email FROM users WHERE email = $1"
-        existing_user = await conn.fetchrow(query, cred.email)
+        async with pooled_connection() as conn:
+            existing_user = await conn.fetchrow(query, cred.email)
         if existing_user:
             raise HTTPException(status_code=400, detail="email already exists")
 
         # Hash the password before storing
-        hashed_password = bcrypt.hashpw(cred.password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = await password_hasher.hash(cred.password)
 
         # Insert new user into the database
         query = """
         INSERT INTO users (password, email, DOB) 
         VALUES ($1, $2, $3)
         """
-        await conn.execute(query, hashed_password.decode('utf-8'), cred.email, cred.DOB)
+        async with pooled_connection() as conn:
+            await conn.execute(query, hashed_password, cred.email, cred.DOB)
 
         return {"message": "User created successfully", "status": True}
+    except HTTPException:
+        raise
+    except UniqueViolationError:
+        # A concurrent signup with the same email won the race to users_email_key
+        raise HTTPException(status_code=400, detail="email already exists")
     except Exception as e:
         print(e)
-        return HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        # Close the database connection
-        await close_connection(conn)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 # Main route for user profile
 @app.post("/profile")
 async def profile(
-    token: str,  # Get the user ID from token verification
+    token: str,  # Bearer token, verified locally
 ):
-    user_id: int = await verify_jwt_token(token)
+    # Rejected tokens never take a pooled connection
+    payload = verify_jwt_token(token, SECRET_KEY=SECRET_KEY, ALGORITHM=ALGORITHM)
     
-    # Get the database connection
-    conn = await open_connection()
     try:
-        # Query to get user profile by ID
-        query = "SELECT * FROM users WHERE id = $1"
-        result = await conn.fetchrow(query, user_id)
+        # Query to get user profile by the email the token was issued for
+        query = "SELECT * FROM users WHERE email = $1"
+        async with pooled_connection() as conn:
+            result = await conn.fetchrow(query, payload["email"])
 
         if result:
             # print(result)
@@ -185,11 +266,37 @@ async def profile(
             }
         else:
             raise HTTPException(status_code=404, detail="User not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        # Close the database connection
-        await close_connection(conn)
+
+@app.post("/logout")
+async def logout(token: str):
+    """Revoke a token so it is rejected before it expires"""
+    payload = verify_jwt_token(token, SECRET_KEY=SECRET_KEY, ALGORITHM=ALGORITHM)
+    if payload.get("jti"):
+        async with pooled_connection() as conn:
+            await revocation_cache.revoke(
+                conn,
+                payload["jti"],
+                payload["email"],
+                datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            )
+    return {"message": "Logged out successfully"}
+
+@app.get("/metrics")
+async def metrics():
+    """Expose runtime statistics for monitoring"""
+    return {
+        "db_pool": pool_stats(),
+        "token_revocation": revocation_cache.stats(),
+        "login_audit": login_audit.stats(),
+        "password_hashing": password_hasher.stats(),
+        "mining": recycle.miner.last_stats,
+        "mempool": recycle.mempool.stats(),
+        "mongo_mirror": app.state.mongo_mirror.stats() if getattr(app.state, "mongo_mirror", None) else None,
+    }
 
 @app.post("/transfer", response_model=TransferResponse)
 async def transfer_tokens(request: TransferRequest):
@@ -207,23 +314,51 @@ async def transfer_tokens(request: TransferRequest):
             recipient=transaction.recipient,
             amount=transaction.amount,
             timestamp=transaction.timestamp,
-            status="completed"
+            status=transaction.status.value
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/transfer/{transaction_hash}")
+async def get_transfer_status(transaction_hash: str):
+    """Check whether a transfer is still pending or has been mined"""
+    transaction = token_system.get_transaction(transaction_hash)
+    if transaction is None:
+        raise HTTPException(status_code=404, detail="Transfer not found")
+    return {
+        "transaction_hash": transaction.transaction_hash,
+        "status": transaction.status.value,
+        "batch_hash": transaction.batch_hash,
+        "nonce": transaction.nonce,
+        "pending_transfers": len(token_system.pending_transactions),
+    }
+
 @app.get("/balance/{address}")
 async def get_balance(address: str):
     return {"address": address, "balance": token_system.balances.get(address, 0.0)}
 
 @app.get("/transactions/{address}")
-async def get_transactions(address: str, limit: int = 10):
-    transactions = [
-        tx for tx in token_system.token_transactions
-        if tx.sender == address or tx.recipient == address
-    ][:limit]
-    
-    return transactions
+async def get_transactions(
+    address: str,
+    limit: int = Query(10, ge=1, le=1000),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    """Token transfers for an address, newest first, paged by transaction hash"""
+    return [
+        transaction.to_dict()
+        for transaction in token_system.transactions_for(address, limit=limit, before=before, after=after)
+    ]
+
+@app.get("/ewaste/transactions/{address}")
+async def get_ewaste_transactions(
+    address: str,
+    limit: int = Query(10, ge=1, le=1000),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    """Sealed e-waste transactions for an address, newest first, paged by transaction hash"""
+    return recycle.transactions_for(address, limit=limit, before=before, after=after)
 
 
 
@@ -265,16 +400,75 @@ async def create_transaction(transaction: TransactionModel):
 
     Returns:
         dict: A message indicating the transaction will be added to the next block.
+        A duplicate of a pending transaction gets 409.
     """
-    transaction_index = recycle.add_transaction(
-        sender=transaction.sender,
-        recipient=transaction.recipient,
-        ewaste_items=transaction.ewaste_items,
-        transaction_type=transaction.transaction_type,
-        status=transaction.status,
-    )
+    try:
+        transaction_index, added = recycle.add_transaction(
+            sender=transaction.sender,
+            recipient=transaction.recipient,
+            ewaste_items=transaction.ewaste_items,
+            transaction_type=transaction.transaction_type,
+            status=transaction.status,
+        )
+    except MempoolFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    if not added:
+        raise HTTPException(status_code=409, detail="Transaction is already pending")
     return {"message": f"Transaction will be added to block {transaction_index}"}
 
+@app.post("/create_transactions/bulk")
+async def create_transactions_bulk(request: Request):
+    """
+    Create many transactions in one request.
+
+    The body is either a JSON array of transactions or NDJSON (one
+    transaction per line, with Content-Type application/x-ndjson). Valid
+    transactions are scored and queued together; invalid ones are
+    reported individually and skipped.
+
+    Returns:
+        dict: Counts, the block the accepted transactions will join, and a result per item.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            raw_items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            raw_items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+    if not isinstance(raw_items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON")
+
+    results = []
+    accepted = []
+    for position, raw in enumerate(raw_items):
+        try:
+            accepted.append(transaction_adapter.validate_python(raw))
+            results.append({"index": position, "accepted": True})
+        except ValidationError as e:
+            results.append({"index": position, "accepted": False, "errors": e.errors(include_url=False, include_input=False, include_context=False)})
+
+    block_index = None
+    if accepted:
+        try:
+            block_index, added = recycle.add_transactions(accepted)
+        except MempoolFull as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+        # Mark accepted items that were already pending as duplicates
+        added = iter(added)
+        for result in results:
+            if result["accepted"] and not next(added):
+                result.update({"accepted": False, "duplicate": True})
+
+    accepted_count = sum(result["accepted"] for result in results)
+    return {
+        "accepted": accepted_count,
+        "rejected": len(raw_items) - accepted_count,
+        "block_index": block_index,
+        "results": results,
+    }
+
 # @app.get("/mine")
 # async def mine_block(miner_address: str):
 #     """Mine a new block"""
@@ -292,19 +486,93 @@ async def create_transaction(transaction: TransactionModel):
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=str(e))
     
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
 @app.get("/chain")
-async def get_full_chain():
-    """Get the full blockchain"""
+async def get_full_chain(
+    request: Request,
+    from_index: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    stream: bool = False,
+):
+    """Get the blockchain, or the blocks from position from_index onwards.
+
+    With stream=true the blocks are sent as NDJSON, one block per line, as
+    they are serialised; if the chain is replaced by a fork mid-stream the
+    stream stops rather than mixing blocks from both. The ETag is the tip
+    block's hash, so a client that already holds the tip gets a 304 without
+    a body.
+    """
+    chain = recycle.chain
+    length = len(chain)
+    etag = f'"{recycle.block_hashes[-1]}"'
+    headers = {"ETag": etag, "X-Chain-Length": str(length)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    end = length if limit is None else min(length, from_index + limit)
+    if stream:
+        # Blocks link by hash, so the chain up to `end` is unchanged as long
+        # as the last block sent still has this hash
+        last_hash = recycle.block_hashes[end - 1] if end > from_index else None
+
+        async def blocks():
+            for start in range(from_index, end, STREAM_PAGE_SIZE):
+                page = list(chain[start:min(end, start + STREAM_PAGE_SIZE)])
+                if len(recycle.block_hashes) < end or recycle.block_hashes[end - 1] != last_hash:
+                    print("Chain replaced while streaming; ending the stream early")
+                    return
+                for block in page:
+                    yield json.dumps(block) + "\n"
+        return StreamingResponse(blocks(), media_type="application/x-ndjson", headers=headers)
+
+    return JSONResponse(
+        content={
+            "chain": list(chain[from_index:end]),
+            "length": length,
+            "from_index": from_index,
+        },
+        headers=headers,
+    )
+
+@app.get("/chain/tip")
+async def get_chain_tip():
+    """Chain length and tip hash, for peers deciding whether to sync"""
+    return recycle.tip()
+
+@app.get("/proof/{tx_hash}")
+async def get_transaction_proof(tx_hash: str):
+    """Merkle path proving a sealed e-waste transaction is in a block.
+
+    Check it with blockchain.merkle.verify_merkle_path(tx_hash, path,
+    header["merkle_root"]); the header hashes to block_hash.
+    """
+    proof = recycle.transaction_proof(tx_hash)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Transaction not found in any sealed block")
+    return proof
+
+@app.get("/nodes/resolve")
+async def resolve_nodes():
+    """Sync with registered nodes, adopting the longest valid chain"""
+    replaced = await recycle.resolve_conflicts()
     return {
-        "chain": recycle.chain,
-        "length": len(recycle.chain)
+        "message": "Our chain was replaced" if replaced else "Our chain is authoritative",
+        **recycle.tip()
     }
 
 @app.get("/chain/validate")
-async def validate_chain():
-    """Validate the entire blockchain"""
-    is_valid = recycle.valid_chain(recycle.chain)
+async def validate_chain(full: bool = False):
+    """Validate blocks added since the last check, or the entire blockchain with full=true"""
+    is_valid = recycle.validate(full=full)
     return {
         "is_valid": is_valid,
-        "chain_length": len(recycle.chain)
+        "chain_length": len(recycle.chain),
+        "validated_upto": recycle.validated_upto
     }
@@ -0,0 +1,79 @@
+"""Compare login audit cost on the request path, inline INSERT vs write-behind.
+
+"before" awaits one INSERT INTO login_logs per login on a pooled connection;
+"after" is LoginAuditLog.record, with the background writer copying batches
+into the table. The write-behind rows are counted after draining so none
+are lost.
+
+Usage: python -m benchmarks.audit_bench [--requests 5000] [--concurrency 50]
+Needs the Postgres settings from .env.
+"""
+import argparse
+import asyncio
+import time
+from dotenv import load_dotenv
+
+from backend.audit import LoginAuditLog
+from backend.db import create_pool, close_pool
+from backend.migrations import migrate
+
+
+async def run(label, attempt, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await attempt(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {requests / elapsed:>12,.0f} req/s  ({elapsed:.2f}s for {requests} requests)")
+
+
+async def main(requests, concurrency):
+    load_dotenv()
+    pool = await create_pool()
+    try:
+        async with pool.acquire() as conn:
+            await migrate(conn)
+            await conn.execute("DELETE FROM login_logs WHERE email LIKE 'audit-bench-%'")
+
+        async def before(i):
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    "INSERT INTO login_logs (email, success, error_message, token) VALUES ($1, $2, $3, $4);",
+                    "audit-bench-before", True, None, f"token-{i}",
+                )
+
+        audit = LoginAuditLog(max_pending=requests)
+        writer = asyncio.create_task(audit.run(pool))
+
+        async def after(i):
+            audit.record("audit-bench-after", True, f"token-{i}")
+
+        await run("before", before, requests, concurrency)
+        await run("after", after, requests, concurrency)
+
+        start = time.perf_counter()
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        await audit.drain(pool)
+        print(f"drained in {time.perf_counter() - start:.2f}s  stats: {audit.stats()}")
+
+        async with pool.acquire() as conn:
+            written = await conn.fetchval("SELECT count(*) FROM login_logs WHERE email = 'audit-bench-after'")
+            await conn.execute("DELETE FROM login_logs WHERE email LIKE 'audit-bench-%'")
+        print(f"{'ok  ' if written == requests else 'FAIL'} {written}/{requests} write-behind rows in login_logs")
+        if written != requests:
+            raise SystemExit(1)
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,67 @@
+"""Compare token verification throughput before and after stateless JWT checks.
+
+"before" repeats the old per-request lookup (SELECT ... FROM login_logs WHERE
+token = $1 on a pooled connection); "after" is verify_jwt_token, which checks
+the signature, expiry and the in-process revocation cache.
+
+Usage: python -m benchmarks.auth_bench [--requests 5000] [--concurrency 50]
+Needs the Postgres settings from .env.
+"""
+import argparse
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from backend.db import create_pool, close_pool
+from backend.func import create_jwt_token, verify_jwt_token
+from backend.migrations import migrate
+
+ALGORITHM = "HS256"
+
+
+async def run(label, check, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await check()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {requests / elapsed:>12,.0f} req/s  ({elapsed:.2f}s for {requests} requests)")
+
+
+async def main(requests, concurrency):
+    load_dotenv()
+    secret = os.environ.get("SECRET_KEY") or "benchmark-secret"
+    pool = await create_pool()
+    try:
+        async with pool.acquire() as conn:
+            await migrate(conn)
+            token, _ = create_jwt_token("bench@example.com", SECRET_KEY=secret, ALGORITHM=ALGORITHM)
+            await conn.execute(
+                "INSERT INTO login_logs (email, success, token) VALUES ($1, $2, $3);",
+                "bench@example.com", True, token,
+            )
+
+        async def before():
+            async with pool.acquire() as conn:
+                await conn.fetchrow("SELECT id FROM login_logs WHERE token = $1", token)
+
+        async def after():
+            verify_jwt_token(f"Bearer {token}", SECRET_KEY=secret, ALGORITHM=ALGORITHM)
+
+        await run("before", before, requests, concurrency)
+        await run("after", after, requests, concurrency)
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
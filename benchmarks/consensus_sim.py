@@ -0,0 +1,110 @@
+"""Simulate a network of RecycleChain nodes in-process and time convergence.
+
+Each peer is a small ASGI app serving /chain and /chain/tip for its own
+RecycleChain; requests are routed to the right app by host name, so no
+sockets are opened. All peers share a common history, one leader mines
+extra blocks, a few others fork off with blocks of their own, and then
+every follower runs resolve_conflicts until it holds the leader's chain.
+
+Usage: python -m benchmarks.consensus_sim [--peers 20] [--shared 2000] [--ahead 50] [--forked 5]
+"""
+import argparse
+import asyncio
+import copy
+import time
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Query
+
+from blockchain.blockchain import RecycleChain
+
+
+def create_peer_app(chain: RecycleChain) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/chain")
+    async def get_chain(from_index: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+        end = len(chain.chain) if limit is None else min(len(chain.chain), from_index + limit)
+        return {"chain": list(chain.chain[from_index:end]), "length": len(chain.chain)}
+
+    @app.get("/chain/tip")
+    async def get_tip():
+        return chain.tip()
+
+    return app
+
+
+class PeerRouter(httpx.AsyncBaseTransport):
+    """Routes each request to the in-process app registered for its host"""
+
+    def __init__(self):
+        self.transports = {}
+        self.requests = 0
+        self.bytes_received = 0
+
+    def add(self, host: str, app: FastAPI):
+        self.transports[host] = httpx.ASGITransport(app=app)
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        response = await self.transports[request.url.netloc.decode()].handle_async_request(request)
+        body = await response.aread()
+        self.bytes_received += len(body)
+        return httpx.Response(response.status_code, headers=response.headers, content=body)
+
+
+def mine(chain: RecycleChain, blocks: int, tag: str):
+    for i in range(blocks):
+        chain.mempool.add({"sender": tag, "recipient": "center", "reward": i})
+        chain.new_block(chain.proof_of_work(chain.last_block), chain.block_hashes[-1])
+
+
+def join(chain: RecycleChain) -> RecycleChain:
+    """A node started on its own, with its own genesis block, that has
+    received the blocks mined so far on `chain`"""
+    other = RecycleChain(difficulty=chain.difficulty, mining_workers=1)
+    if other.block_hashes[0] != chain.block_hashes[0]:
+        raise SystemExit("independently started nodes have different genesis blocks")
+    other.replace_suffix(1, copy.deepcopy(list(chain.chain[1:])), list(chain.block_hashes[1:]))
+    return other
+
+
+async def main(peers, shared, ahead, forked):
+    base = RecycleChain(difficulty=1, mining_workers=1)
+    mine(base, shared, "shared")
+
+    nodes = {f"peer{i}:5000": join(base) for i in range(peers)}
+    leader = "peer0:5000"
+    mine(nodes[leader], ahead, "leader")
+    for i in range(1, forked + 1):
+        mine(nodes[f"peer{i}:5000"], 3, f"fork{i}")
+
+    router = PeerRouter()
+    for host, chain in nodes.items():
+        router.add(host, create_peer_app(chain))
+        chain.nodes = {other for other in nodes if other != host}
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=router, timeout=5.0) as client:
+        followers = [chain for host, chain in nodes.items() if host != leader]
+        await asyncio.gather(*(chain.resolve_conflicts(client) for chain in followers))
+    elapsed = time.perf_counter() - start
+
+    target = nodes[leader].tip()
+    converged = sum(chain.tip() == target for chain in nodes.values())
+    print(f"peers={peers} shared={shared} ahead={ahead} forked={forked}")
+    print(f"converged {converged}/{peers} in {elapsed:.3f}s, "
+          f"{router.requests} requests, {router.bytes_received / 1024:.0f} KiB received")
+    if converged != peers or not all(chain.validate(full=True) for chain in nodes.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peers", type=int, default=20)
+    parser.add_argument("--shared", type=int, default=2000)
+    parser.add_argument("--ahead", type=int, default=50)
+    parser.add_argument("--forked", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.peers, args.shared, args.ahead, args.forked))
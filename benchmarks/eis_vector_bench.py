@@ -0,0 +1,67 @@
+"""Time the vectorised EIS path against the scalar DeviceEISCalculator.
+
+Every device uses the smartphone material list with its quantities jittered
+by up to +/-20%. A sample of devices is also scored with the scalar
+calculator to confirm the results are bit-for-bit identical.
+
+Usage: python -m benchmarks.eis_vector_bench [--devices 1000 100000 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from Python.EISEngine import DEFAULT_MATERIALS_CSV, load_material_table
+from Python.EISGen import DeviceEISCalculator, MaterialData
+from Python.EISVector import device_eis
+
+
+def scalar_eis(calculator, table, quantities, conditions, ages, recyclability):
+    """Score one device with DeviceEISCalculator's own methods"""
+    calculator.materials_data = {
+        element: MaterialData(impact, float(q), float(c), int(a), float(r))
+        for element, impact, q, c, a, r in zip(table.elements, table.impact_factors,
+                                               quantities, conditions, ages, recyclability)
+    }
+    calculator.total_weight = 0
+    for q in quantities:
+        calculator.total_weight += float(q)
+    calculator.total_mi = 0
+    calculator.calculate_material_impacts()
+    weighted_ca, weighted_af, weighted_rf = calculator.calculate_weighted_factors()
+    return calculator.total_mi * weighted_ca * weighted_af * (1 - weighted_rf)
+
+
+def main(device_counts, sample):
+    table = load_material_table(DEFAULT_MATERIALS_CSV)
+    calculator = DeviceEISCalculator(DEFAULT_MATERIALS_CSV)
+    conditions = np.array([calculator.default_conditions.get(e, 1.0) for e in table.elements])
+    ages = np.array([calculator.default_ages.get(e, 0) for e in table.elements])
+    recyclability = np.array([calculator.default_recyclability.get(e, 0.5) for e in table.elements])
+    rng = np.random.default_rng(0)
+
+    print(f"{'devices':>9} {'vector s':>10} {'scalar s (est.)':>16} {'speed-up':>9} {'identical':>10}")
+    for n in device_counts:
+        quantities = np.asarray(table.quantities) * rng.uniform(0.8, 1.2, size=(n, len(table.elements)))
+
+        start = time.perf_counter()
+        result = device_eis(table.impact_factors, quantities, conditions, ages, recyclability)
+        vector_seconds = time.perf_counter() - start
+
+        checked = min(n, sample)
+        start = time.perf_counter()
+        expected = [scalar_eis(calculator, table, quantities[i], conditions, ages, recyclability)
+                    for i in range(checked)]
+        scalar_seconds = (time.perf_counter() - start) * n / checked
+        identical = bool(np.array_equal(result["eis"][:checked], np.array(expected)))
+
+        print(f"{n:>9} {vector_seconds:>10.3f} {scalar_seconds:>16.3f} "
+              f"{scalar_seconds / vector_seconds:>8.0f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--sample", type=int, default=1_000, help="devices checked against the scalar path")
+    args = parser.parse_args()
+    main(args.devices, args.sample)
@@ -0,0 +1,70 @@
+"""Compare block hashing throughput of JSON serialisation and the canonical encoding.
+
+Usage: python -m benchmarks.hash_bench [--records 1 10 100] [--seconds 1.0]
+"""
+import argparse
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from blockchain.blockchain import RecycleChain
+from blockchain.supplyChain import Block
+
+
+def rate(fn, seconds):
+    """Calls of fn per second, measured over about `seconds`"""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            fn()
+        calls += 1000
+    return calls / (time.perf_counter() - start)
+
+
+def json_header_hash(block):
+    """RecycleChain.hash as it was: json.dumps(sort_keys=True) of the header"""
+    return hashlib.sha256(json.dumps(RecycleChain.header(block), sort_keys=True).encode()).hexdigest()
+
+
+def main(record_counts, seconds):
+    chain = RecycleChain(difficulty=1, mining_workers=1)
+    block = chain.last_block
+    print("RecycleChain block header")
+    print(f"  {'json':>10}: {rate(lambda: json_header_hash(block), seconds):>12,.0f} hashes/s")
+    print(f"  {'canonical':>10}: {rate(lambda: RecycleChain.hash(block), seconds):>12,.0f} hashes/s")
+
+    print("\nSupplyChain mining attempts")
+    print(f"  {'records':>7} {'json':>14} {'canonical':>14}")
+    for count in record_counts:
+        records = [
+            {"product_id": f"P{i}", "status": "Shipped", "location": f"Warehouse {i}"}
+            for i in range(count)
+        ]
+        block = Block(datetime.now(), records, "0" * 64)
+        nonce = iter(range(10**12))
+
+        def json_attempt():
+            # Previous Block.calculate_hash: reserialises everything per nonce
+            data = str(block.timestamp) + json.dumps(block.product_data) + block.previous_hash + str(next(nonce))
+            hashlib.sha256(data.encode()).hexdigest()
+
+        prefix = hashlib.sha256(block.encoded_prefix())
+
+        def canonical_attempt():
+            # Block.mine_block: data encoded once, only the nonce is hashed per attempt
+            attempt = prefix.copy()
+            attempt.update(str(next(nonce)).encode())
+            attempt.digest()
+
+        print(f"  {count:>7} {rate(json_attempt, seconds):>14,.0f} {rate(canonical_attempt, seconds):>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.records, args.seconds)
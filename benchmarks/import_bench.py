@@ -0,0 +1,75 @@
+"""Measure cold import time of the API with -X importtime and check it against the budget.
+
+Usage: python -m benchmarks.import_bench [--budget benchmarks/import_budget.json] [--top 15]
+
+Exits with status 1 if the median import time is over budget_ms, or if a
+module listed under "lazy" is loaded at import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+
+def import_times(module):
+    """Cumulative import time in microseconds of each module loaded by importing `module`
+    (not by interpreter start-up), and the names of the ones it imported directly"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    # Lines are "import time: self [us] | cumulative | name", children before their
+    # parent and indented two spaces per level; collect everything under `module`
+    times = {}
+    direct = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0 and name != module:
+            times, direct = {}, []
+            continue
+        times[name] = int(cumulative)
+        if depth == 1:
+            direct.append(name)
+        if name == module:
+            break
+    return times, direct
+
+
+def main(budget_path, top):
+    with open(budget_path) as file:
+        budget = json.load(file)
+    module = budget["module"]
+
+    runs = [import_times(module) for _ in range(budget["runs"])]
+    median_ms = statistics.median(times[module] for times, _ in runs) / 1000
+    print(f"{module}: {median_ms:.0f} ms median over {len(runs)} runs (budget {budget['budget_ms']} ms)")
+
+    last, direct = runs[-1]
+    print(f"\nslowest direct imports of {module} (last run):")
+    children = sorted(((last[name], name) for name in direct), reverse=True)
+    for t, name in children[:top]:
+        print(f"  {t / 1000:>8.1f} ms  {name}")
+
+    loaded = [name for name in budget["lazy"] if name in last]
+    for name in loaded:
+        print(f"FAIL {name} is imported by {module} but should load lazily")
+    if median_ms > budget["budget_ms"]:
+        print(f"FAIL import time is over budget")
+    if loaded or median_ms > budget["budget_ms"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", default=DEFAULT_BUDGET)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.budget, args.top)
@@ -0,0 +1,65 @@
+"""Compare e-waste intake throughput of the single-item and bulk endpoints.
+
+Requests go straight to the ASGI app in-process, so the numbers reflect
+handler, validation and scoring cost rather than network overhead.
+
+Usage: python -m benchmarks.intake_bench [--items 5000] [--batch 1000]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from backend.server import app, recycle
+
+
+def make_transaction(i):
+    return {
+        "sender": f"center-{i % 50}",
+        "recipient": "recycler",
+        "ewaste_items": [{
+            "item_id": f"item-{i}",
+            "type": "Smartphone",
+            "weight": 0.2,
+            "components": ["BATTERIES", "SCREENS", "CIRCUIT_BOARDS"],
+            "manufacturer": "Acme",
+            "year": 2015 + i % 8,
+        }],
+        "transaction_type": "drop_off",
+        "status": "collected",
+    }
+
+
+async def main(items, batch):
+    transactions = [make_transaction(i) for i in range(items)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        recycle.mempool.clear()
+        start = time.perf_counter()
+        for transaction in transactions:
+            response = await client.post("/create_transaction/", json=transaction)
+            response.raise_for_status()
+        single = time.perf_counter() - start
+
+        recycle.mempool.clear()
+        start = time.perf_counter()
+        for offset in range(0, items, batch):
+            body = "\n".join(json.dumps(t) for t in transactions[offset:offset + batch])
+            response = await client.post("/create_transactions/bulk", content=body,
+                                         headers={"Content-Type": "application/x-ndjson"})
+            response.raise_for_status()
+            assert response.json()["rejected"] == 0
+        bulk = time.perf_counter() - start
+
+    print(f"single: {items / single:>10,.0f} items/s")
+    print(f"bulk:   {items / bulk:>10,.0f} items/s  (batches of {batch}, {single / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.batch))
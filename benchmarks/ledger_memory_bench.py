@@ -0,0 +1,112 @@
+"""Report memory per ledger record for token transfers and sealed e-waste transactions.
+
+Usage: python -m benchmarks.ledger_memory_bench [--transfers 1000000] [--ewaste 100000]
+"""
+import argparse
+import gc
+import hashlib
+import time
+import tracemalloc
+from datetime import datetime
+
+from blockchain.blockchain import EWasteItem, EWasteStatus, RecycleChain, TokenSystem, TokenTransaction
+from blockchain.mempool import Mempool
+
+
+class DictTokenTransaction:
+    """TokenTransaction as it was: a plain class with a per-instance __dict__"""
+
+    def __init__(self, sender, recipient, amount, timestamp, transaction_hash, memo=None, status="confirmed"):
+        self.sender = sender
+        self.recipient = recipient
+        self.amount = amount
+        self.timestamp = timestamp
+        self.transaction_hash = transaction_hash
+        self.memo = memo
+        self.status = status
+        self.batch_hash = None
+        self.nonce = None
+
+
+def measure(build):
+    """Bytes still allocated after build() returns, and the value it built"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used, time.perf_counter() - start, value
+
+
+def transfers(count, accounts, transaction_class, use_ledger):
+    """Confirmed transfers held as a TokenSystem holds them"""
+    ledger = TokenSystem()
+    legacy = {"by_hash": {}, "positions": {}, "index": {}, "transactions": []}
+    batch_hash = hashlib.sha256(b"batch").hexdigest()
+    timestamp = datetime.now()
+    for i in range(count):
+        # Build names per record, as they arrive from requests
+        transaction = transaction_class(
+            f"account-{i % accounts}", f"account-{(i * 7 + 1) % accounts}", 1.0, timestamp,
+            hashlib.sha256(i.to_bytes(8, "big")).hexdigest(),
+        )
+        transaction.batch_hash = batch_hash
+        transaction.nonce = i
+        if use_ledger:
+            ledger._record_confirmed(transaction)
+            ledger.transactions_by_hash[transaction.transaction_hash] = transaction
+        else:
+            # The same lookups with the previous list-of-ints index
+            position = len(legacy["transactions"])
+            legacy["transactions"].append(transaction)
+            legacy["positions"][transaction.transaction_hash] = position
+            legacy["by_hash"][transaction.transaction_hash] = transaction
+            for address in {transaction.sender, transaction.recipient}:
+                legacy["index"].setdefault(address, []).append(position)
+    return ledger, legacy
+
+
+def ewaste_chain(count, accounts, per_block):
+    chain = RecycleChain(difficulty=1, mining_workers=1, mempool=Mempool(max_transactions=per_block),
+                         max_block_transactions=per_block)
+    item = EWasteItem(item_id="item", type="Phone", weight=0.2, components=["battery", "screen"],
+                      manufacturer="Acme", year=2019)
+    for i in range(count):
+        chain.mempool.add(chain._build_transaction(
+            f"account-{i % accounts}", f"account-{(i * 7 + 1) % accounts}", [item],
+            "drop-off", EWasteStatus.COLLECTED, 1.0,
+        ))
+        if len(chain.mempool) >= per_block:
+            chain.new_block(proof=0, previous_hash=None)
+    if len(chain.mempool):
+        chain.new_block(proof=0, previous_hash=None)
+    return chain
+
+
+def main(transfer_count, ewaste_count, accounts, per_block):
+    print(f"token transfers: {transfer_count:,} across {accounts:,} accounts")
+    for label, transaction_class, use_ledger in (
+        ("dict objects, list index", DictTokenTransaction, False),
+        ("slotted, array index", TokenTransaction, True),
+    ):
+        used, seconds, _ = measure(lambda: transfers(transfer_count, accounts, transaction_class, use_ledger))
+        print(f"  {label:<26} {used / transfer_count:>8.1f} bytes/transfer  ({seconds:.1f}s)")
+
+    print(f"\ne-waste transactions: {ewaste_count:,} in blocks of {per_block}")
+    used, seconds, chain = measure(lambda: ewaste_chain(ewaste_count, accounts, per_block))
+    print(f"  {'blocks':<26} {used / ewaste_count:>8.1f} bytes/transaction  ({seconds:.1f}s)")
+    used, seconds, _ = measure(chain._index_blocks)
+    print(f"  {'address/location index':<26} {used / ewaste_count:>8.1f} bytes/transaction  ({seconds:.1f}s)")
+    chain.miner.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=1_000_000)
+    parser.add_argument("--ewaste", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--block-size", type=int, default=500)
+    args = parser.parse_args()
+    main(args.transfers, args.ewaste, args.accounts, args.block_size)
@@ -0,0 +1,38 @@
+"""Measure RecycleChain proof-of-work latency across difficulties and worker counts.
+
+Usage: python -m benchmarks.mining_bench [--difficulties 4 5 6] [--workers 1 2 4]
+"""
+import argparse
+import hashlib
+import os
+
+from blockchain.mining import ParallelMiner
+
+
+def main(difficulties, worker_counts, rounds):
+    print(f"{'difficulty':>10} {'workers':>8} {'avg s':>10} {'hashes/s':>14}")
+    for difficulty in difficulties:
+        for workers in worker_counts:
+            miner = ParallelMiner(workers=workers)
+            try:
+                # Warm the pool up so process start-up is not timed
+                miner.search(b"0", b"warmup", 1)
+                seconds = hashes = 0.0
+                for r in range(rounds):
+                    last_hash = hashlib.sha256(f"block-{r}".encode()).hexdigest().encode()
+                    miner.search(b"100", last_hash, difficulty)
+                    seconds += miner.last_stats["seconds"]
+                    hashes += miner.last_stats["hashes"]
+                print(f"{difficulty:>10} {workers:>8} {seconds / rounds:>10.3f} {hashes / seconds:>14,.0f}")
+            finally:
+                miner.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--difficulties", type=int, nargs="+", default=[4, 5, 6])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    main(args.difficulties, args.workers, args.rounds)
@@ -0,0 +1,110 @@
+"""Mirror a RecycleChain into MongoDB and check the copy matches the chain.
+
+Usage: python -m benchmarks.mongo_mirror_bench [--blocks 2000] [--per-block 50] [--uri memory://]
+
+Uses the in-memory stand-in by default; pass --uri mongodb://localhost:27017
+to run against a local mongod (the database given by --db is dropped first).
+"""
+import argparse
+import time
+
+from blockchain.blockchain import EWasteItem, EWasteStatus, RecycleChain
+from blockchain.mempool import Mempool
+from blockchain.mongo_db import InMemoryDatabase, MongoMirror
+from blockchain.schemas import BLOCKS, TRANSACTIONS
+
+
+def seal(chain, blocks, per_block, tag):
+    """Seal blocks of fresh transactions without proof of work; returns seconds spent sealing"""
+    seconds = 0.0
+    for b in range(blocks):
+        for t in range(per_block):
+            item = EWasteItem(item_id=f"{tag}-{b}-{t}", type="Phone", weight=0.2, components=["BATTERIES"],
+                              manufacturer="Acme", year=2019)
+            chain.mempool.add(chain._build_transaction(
+                f"sender-{t % 10}", f"recipient-{b % 100}", [item], "drop-off", EWasteStatus.COLLECTED, 1.0,
+            ))
+        start = time.perf_counter()
+        chain.new_block(proof=0, previous_hash=None)
+        seconds += time.perf_counter() - start
+    return seconds
+
+
+def database_for(uri, name):
+    if uri.startswith("memory://"):
+        return InMemoryDatabase()
+    from pymongo import MongoClient
+    client = MongoClient(uri)
+    client.drop_database(name)
+    return client[name]
+
+
+def check(database, chain, label):
+    """Compare the mirrored documents with the chain"""
+    expected_transactions = sum(len(block["transactions"]) for block in chain.chain)
+    blocks = database[BLOCKS].count_documents({})
+    transactions = database[TRANSACTIONS].count_documents({})
+    tip = database[BLOCKS].find_one(sort=[("index", -1)])
+    ok = (blocks == len(chain.chain) and transactions == expected_transactions
+          and tip["_id"] == chain.block_hashes[-1])
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}: {blocks} blocks, {transactions} transactions mirrored")
+    return ok
+
+
+def drain(mirror):
+    start = time.perf_counter()
+    mirror.stop()
+    return time.perf_counter() - start
+
+
+def main(block_count, per_block, uri, db_name, batch_size):
+    chain = RecycleChain(difficulty=1, mining_workers=1, mempool=Mempool(max_transactions=per_block),
+                         max_block_transactions=per_block)
+    baseline = seal(chain, block_count, per_block, "base")
+    database = database_for(uri, db_name)
+
+    mirror = MongoMirror(database, batch_size=batch_size, flush_interval=0.05)
+    start = time.perf_counter()
+    mirror.start(chain)
+    mirrored = seal(chain, block_count, per_block, "mirrored")
+    drained = drain(mirror)
+    total = 2 * block_count * per_block
+    print(f"sealing {block_count} blocks of {per_block}: {baseline / block_count * 1e6:.0f} us/block without a "
+          f"mirror, {mirrored / block_count * 1e6:.0f} us/block with one")
+    print(f"mirrored {total:,} transactions in {time.perf_counter() - start:.2f}s "
+          f"({drained:.2f}s draining after the last block)")
+    results = [check(database, chain, "backfill and live blocks")]
+
+    # A fork replaces the last blocks; the mirror must drop the old ones
+    mirror = MongoMirror(database, batch_size=batch_size, flush_interval=0.05)
+    mirror.start(chain)
+    fork = RecycleChain(difficulty=1, mining_workers=1, mempool=Mempool(max_transactions=per_block),
+                        max_block_transactions=per_block)
+    start_position = len(chain.chain) - 10
+    fork.replace_suffix(0, list(chain.chain[:start_position]), list(chain.block_hashes[:start_position]))
+    seal(fork, 15, per_block, "fork")
+    chain.replace_suffix(start_position, list(fork.chain[start_position:]), list(fork.block_hashes[start_position:]))
+    drain(mirror)
+    results.append(check(database, chain, "after a fork"))
+    print(f"  stats: {mirror.stats()}")
+
+    # Restarting resumes after the last mirrored block instead of rewriting everything
+    mirror = MongoMirror(database, batch_size=batch_size, flush_interval=0.05)
+    mirror.start(chain)
+    drain(mirror)
+    results.append(check(database, chain, "after a restart") and mirror.mirrored_blocks == 0)
+    for c in (chain, fork):
+        c.miner.shutdown()
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--per-block", type=int, default=50)
+    parser.add_argument("--uri", default="memory://")
+    parser.add_argument("--db", default="byteback_mirror_bench")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.blocks, args.per_block, args.uri, args.db, args.batch_size)
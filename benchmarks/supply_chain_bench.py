@@ -0,0 +1,65 @@
+"""Time SupplyChain mining and validation with one and several processes.
+
+Usage: python -m benchmarks.supply_chain_bench [--blocks 50000] [--workers 1 4] [--complexity 5]
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from blockchain.mining import ParallelMiner
+from blockchain.supplyChain import Block, SupplyChain
+
+
+def long_chain(blocks, records_per_block):
+    """A valid chain of unmined blocks; validation only checks hashes and links"""
+    chain = SupplyChain(mining_workers=1)
+    for i in range(blocks):
+        records = [
+            {"product_id": f"P{(i * records_per_block + r) % 10_000}", "status": "Shipped",
+             "location": f"Warehouse {r}"}
+            for r in range(records_per_block)
+        ]
+        chain.chain.append(Block(datetime.now(), records, chain.get_latest_block().hash))
+    return chain
+
+
+def main(blocks, records_per_block, worker_counts, complexity, rounds):
+    chain = long_chain(blocks, records_per_block)
+    print(f"is_chain_valid over {blocks:,} blocks of {records_per_block} records")
+    for workers in worker_counts:
+        # The second call reuses the process pool started by the first
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            valid = chain.is_chain_valid(workers=workers)
+            timings.append(time.perf_counter() - start)
+        print(f"  workers={workers:<3} {timings[0]:>8.2f}s cold {timings[1]:>8.2f}s warm  valid={valid}")
+    chain.close()
+
+    print(f"\nmine_block at complexity {complexity}, {rounds} blocks")
+    for workers in worker_counts:
+        miner = ParallelMiner(workers=workers)
+        try:
+            # Warm the pool up so process start-up is not timed
+            Block(datetime.now(), [], "0").mine_block(1, miner)
+            seconds = 0.0
+            for r in range(rounds):
+                block = Block(datetime.now(), [{"product_id": f"P{r}", "status": "Shipped"}], "0" * 64)
+                start = time.perf_counter()
+                block.mine_block(complexity, miner)
+                seconds += time.perf_counter() - start
+            print(f"  workers={workers:<3} {seconds / rounds:>8.2f}s per block")
+        finally:
+            miner.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=50_000)
+    parser.add_argument("--records", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--complexity", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    main(args.blocks, args.records, args.workers, args.complexity, args.rounds)
@@ -0,0 +1,95 @@
+"""Run concurrent token transfers against one TokenSystem and check that balances are conserved.
+
+Usage: python -m benchmarks.transfer_stress [--transfers 20000] [--threads 16] [--accounts 200]
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchain.blockchain import TokenSystem, TransferStatus
+
+INITIAL_BALANCE = 1_000.0
+
+
+def worker(tokens, accounts, count, seed):
+    """Make `count` random transfers; returns (accepted, rejected)"""
+    rng = random.Random(seed)
+    accepted = rejected = 0
+    for _ in range(count):
+        sender, recipient = rng.sample(accounts, 2)
+        try:
+            # Whole amounts keep float sums exact, so conservation can be checked with ==
+            tokens.transfer(sender, recipient, float(rng.randint(1, 50)))
+            accepted += 1
+        except ValueError:
+            rejected += 1
+    return accepted, rejected
+
+
+def mine_until(tokens, done):
+    """Confirm batches concurrently with the transfers until told to stop"""
+    batches = 0
+    while not done.is_set() or tokens.pending_transactions:
+        if tokens.mine_pending():
+            batches += 1
+        else:
+            time.sleep(0.001)
+    return batches
+
+
+def main(transfers, threads, account_count, lock_seconds, batch_size):
+    tokens = TokenSystem(difficulty=1, max_batch_size=batch_size, recipient_lock_seconds=lock_seconds)
+    accounts = [f"account-{i}" for i in range(account_count)]
+    for account in accounts:
+        tokens.create_account(account)
+        tokens.balances[account] = INITIAL_BALANCE
+    total = INITIAL_BALANCE * account_count
+
+    done = threading.Event()
+    per_thread = transfers // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads + 1) as executor:
+        miner = executor.submit(mine_until, tokens, done)
+        results = [
+            future.result() for future in
+            [executor.submit(worker, tokens, accounts, per_thread, seed) for seed in range(threads)]
+        ]
+        accepted_at = time.perf_counter()
+        done.set()
+        batches = miner.result()
+    elapsed = time.perf_counter() - start
+
+    accepted = sum(a for a, _ in results)
+    rejected = sum(r for _, r in results)
+    confirmed = sum(1 for t in tokens.token_transactions if t.status is TransferStatus.CONFIRMED)
+    balance_sum = sum(tokens.balances.values())
+    negative = [a for a, balance in tokens.balances.items() if balance < 0]
+
+    print(f"threads={threads} accounts={account_count} attempted={per_thread * threads:,}")
+    print(f"accepted {accepted:,}, rejected {rejected:,} "
+          f"({accepted / (accepted_at - start):,.0f} accepted transfers/s)")
+    print(f"confirmed {confirmed:,} in {batches} batches, {elapsed:.2f}s total")
+    checks = {
+        "balances conserved": balance_sum == total,
+        "no negative balances": not negative,
+        "every accepted transfer confirmed": confirmed == accepted,
+        "no reservations left": not tokens.pending_outgoing,
+    }
+    for name, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--lock-seconds", type=float, default=0.0,
+                        help="Recipient lock window; 0 lets recipients send again immediately")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    main(args.transfers, args.threads, args.accounts, args.lock_seconds, args.batch_size)
@@ -0,0 +1,48 @@
+"""Compare full and incremental RecycleChain validation on long chains.
+
+Chains are built at difficulty 1 so that setting them up is quick; the
+validation cost measured is hashing and linkage, which does not depend on
+difficulty.
+
+Usage: python -m benchmarks.validate_bench [--blocks 10000 100000] [--new 10]
+"""
+import argparse
+import time
+
+from blockchain.blockchain import RecycleChain
+
+
+def build_chain(length):
+    chain = RecycleChain(difficulty=1, mining_workers=1)
+    while len(chain.chain) < length:
+        chain.mempool.add({"sender": "a", "recipient": "b", "reward": len(chain.chain)})
+        chain.new_block(chain.proof_of_work(chain.last_block), chain.block_hashes[-1])
+    return chain
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(lengths, new_blocks):
+    print(f"{'blocks':>8} {'full s':>10} {'incremental s':>14} {'new blocks':>11}")
+    for length in lengths:
+        chain = build_chain(length)
+        valid, full_seconds = timed(lambda: chain.validate(full=True))
+        assert valid
+
+        for _ in range(new_blocks):
+            chain.new_block(chain.proof_of_work(chain.last_block), chain.block_hashes[-1])
+        valid, incremental_seconds = timed(chain.validate)
+        assert valid
+        print(f"{length:>8} {full_seconds:>10.3f} {incremental_seconds:>14.6f} {new_blocks:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--new", type=int, default=10)
+    args = parser.parse_args()
+    main(args.blocks, args.new)
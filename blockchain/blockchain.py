@@ -1,16 +1,28 @@
 import asyncio
+import bisect
 import hashlib
+import itertools
 import json
+import sys
+import threading
 import time
-from typing import List, Dict, Set
-from dataclasses import dataclass
+from array import array
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Set, Tuple, TYPE_CHECKING
+from dataclasses import asdict, dataclass
 from enum import Enum
 from urllib.parse import urlparse
-from Python.EIS_final import WeightBasedEISCalculator 
+from blockchain.mining import ParallelMiner
+from blockchain.blockchain_db import BlockStore
+from blockchain.mempool import Mempool
+from blockchain.merkle import merkle_path, merkle_root
+from blockchain.encoding import encode_block_header
 from pydantic import BaseModel
-import httpx
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Sequence
+
+if TYPE_CHECKING:
+    from Python.EISEngine import EISEngine
 
 
 class EWasteStatus(Enum):
@@ -20,7 +32,7 @@ class EWasteStatus(Enum):
     PROCESSED = "processed"
     RECYCLED = "recycled"
 
-@dataclass
+@dataclass(slots=True)
 class EWasteItem:
     item_id: str
     type: str
@@ -37,78 +49,178 @@ class TransactionModel(BaseModel):
     transaction_type: str
     status: EWasteStatus
 
+class TransferStatus(Enum):
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+
 class TokenTransaction:
-    def __init__(self, sender: str, recipient: str, amount: float, timestamp: datetime, transaction_hash: str, memo: Optional[str] = None):
-        self.sender = sender
-        self.recipient = recipient
+    # No per-instance __dict__: the ledger holds one of these per transfer
+    __slots__ = ('sender', 'recipient', 'amount', 'timestamp', 'transaction_hash',
+                 'memo', 'status', 'batch_hash', 'nonce')
+
+    def __init__(self, sender: str, recipient: str, amount: float, timestamp: datetime, transaction_hash: str, memo: Optional[str] = None, status: TransferStatus = TransferStatus.PENDING):
+        # Account names repeat across transfers, so share one string per account
+        self.sender = sys.intern(sender)
+        self.recipient = sys.intern(recipient)
         self.amount = amount
         self.timestamp = timestamp
         self.transaction_hash = transaction_hash
         self.memo = memo
+        self.status = status
+        self.batch_hash: Optional[str] = None  # Set once the transfer is mined
+        self.nonce: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'sender': self.sender,
+            'recipient': self.recipient,
+            'amount': self.amount,
+            'timestamp': self.timestamp,
+            'transaction_hash': self.transaction_hash,
+            'memo': self.memo,
+            'status': self.status.value,
+            'batch_hash': self.batch_hash,
+            'nonce': self.nonce,
+        }
 
 class TokenSystem:
-    def __init__(self):
+    def __init__(self, difficulty: int = 4, max_batch_size: int = 500, store: Optional[BlockStore] = None,
+                 recipient_lock_seconds: float = 5.0):
         self.balances = {}
         self.token_transactions = []
+        # Accounts that may not send until the given time, set when they receive a transfer
         self.account_locks = {}
+        self.recipient_lock_seconds = recipient_lock_seconds
+        # One mutex per account guarding its balances, pending_outgoing and
+        # account_locks entries. Transfers take the mutexes of both parties in
+        # sorted order, so two transfers can never wait on each other in a cycle
+        self._account_mutexes: Dict[str, threading.Lock] = {}
+        self._mutexes_guard = threading.Lock()
+        # Guards the pending pool, the confirmed ledger and its indexes, and the store.
+        # Always taken after (never while waiting for) an account mutex
+        self._ledger_lock = threading.Lock()
+        # Distinguishes identical transfers made in the same microsecond
+        self._sequence = itertools.count()
+        self.difficulty = difficulty
+        self.max_batch_size = max_batch_size
+        # Accepted transfers waiting to be mined, in arrival order
+        self.pending_transactions: Dict[str, TokenTransaction] = {}
+        # Amount each sender has committed to pending transfers
+        self.pending_outgoing: Dict[str, float] = {}
+        self.transactions_by_hash: Dict[str, TokenTransaction] = {}
+        # Positions in token_transactions touching each address, oldest first
+        self.address_index: Dict[str, array] = {}
+        self.transaction_positions: Dict[str, int] = {}
+        # Ledger log of account creations and confirmed transfers
+        self.store = store
+        if store is not None:
+            self._replay(store)
+
+    def _replay(self, store: BlockStore):
+        """Rebuild balances and confirmed transfers from the ledger log"""
+        for record in store.records():
+            if record['kind'] == 'account':
+                self.balances[record['account']] = 0.0
+                continue
+            transaction = TokenTransaction(
+                sender=record['sender'],
+                recipient=record['recipient'],
+                amount=record['amount'],
+                timestamp=datetime.fromisoformat(record['timestamp']),
+                transaction_hash=record['transaction_hash'],
+                memo=record['memo'],
+                status=TransferStatus.CONFIRMED,
+            )
+            transaction.batch_hash = record['batch_hash']
+            transaction.nonce = record['nonce']
+            self.balances.setdefault(transaction.sender, 0.0)
+            self.balances.setdefault(transaction.recipient, 0.0)
+            self.balances[transaction.sender] -= transaction.amount
+            self.balances[transaction.recipient] += transaction.amount
+            self._record_confirmed(transaction)
+            self.transactions_by_hash[transaction.transaction_hash] = transaction
+
+    def _mutex(self, account: str) -> threading.Lock:
+        with self._mutexes_guard:
+            mutex = self._account_mutexes.get(account)
+            if mutex is None:
+                mutex = self._account_mutexes[account] = threading.Lock()
+            return mutex
+
+    @contextmanager
+    def _locked(self, *accounts: str):
+        """Hold the mutexes of the given accounts, acquired in sorted order"""
+        mutexes = [self._mutex(account) for account in sorted(set(accounts))]
+        for mutex in mutexes:
+            mutex.acquire()
+        try:
+            yield
+        finally:
+            for mutex in reversed(mutexes):
+                mutex.release()
 
     def _validate_transfer(self, sender: str, amount: float):
         """Validate if sender has enough balance and that amount is positive"""
         if sender not in self.balances:
             raise ValueError(f"Sender account {sender} does not exist.")
-        if self.balances[sender] < amount:
+        locked_until = self.account_locks.get(sender)
+        if locked_until is not None and locked_until > datetime.now():
+            raise ValueError(f"Sender account {sender} is locked until {locked_until.isoformat()}.")
+        if self.balances[sender] - self.pending_outgoing.get(sender, 0.0) < amount:
             raise ValueError(f"Sender {sender} has insufficient funds.")
         if amount <= 0:
             raise ValueError("Transfer amount must be positive.")
 
     def create_account(self, account: str):
         """Create an account with zero balance"""
+        with self._locked(account):
+            self._open_account(account)
+
+    def _open_account(self, account: str):
+        """Create an account; the caller holds its mutex"""
         self.balances[account] = 0.0
+        if self.store is not None:
+            with self._ledger_lock:
+                self.store.append(
+                    {'kind': 'account', 'account': account},
+                    hashlib.sha256(account.encode('utf-8')).hexdigest()
+                )
 
     def _create_transaction_hash(self, sender: str, recipient: str, amount: float, timestamp: datetime) -> str:
         """Generate a hash for the transaction using the details"""
-        transaction_data = f"{sender}{recipient}{amount}{timestamp}"
+        transaction_data = f"{sender}{recipient}{amount}{timestamp}{next(self._sequence)}"
         return hashlib.sha256(transaction_data.encode('utf-8')).hexdigest()
 
-    def _proof_of_work(self, sender: str, amount: float) -> bool:
-        """Simulate mining by requiring proof of work for every transfer"""
-        difficulty = 5  # Increase difficulty to make it harder
-        target = '0' * difficulty  # Target hash must start with '00000'
-        
-        # Try different nonces until we find one that satisfies the difficulty
+    @staticmethod
+    def _batch_hash(batch: List[TokenTransaction]) -> str:
+        """Hash the transaction hashes of a batch into one digest"""
+        digest = hashlib.sha256()
+        for transaction in batch:
+            digest.update(transaction.transaction_hash.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _proof_of_work(self, batch_hash: str) -> int:
+        """Find a nonce whose hash with the batch digest meets the difficulty"""
+        target = '0' * self.difficulty
+        prefix = hashlib.sha256(batch_hash.encode('utf-8'))
+
         nonce = 0
         while True:
-            transaction_data = f"{sender}{amount}{nonce}"
-            hash_attempt = hashlib.sha256(transaction_data.encode('utf-8')).hexdigest()
-            if hash_attempt.startswith(target):
-                print(f"Mining successful with nonce {nonce}. Hash: {hash_attempt}")
-                return True
+            attempt = prefix.copy()
+            attempt.update(str(nonce).encode('utf-8'))
+            if attempt.hexdigest().startswith(target):
+                return nonce
             nonce += 1
-            time.sleep(0.1)  # Add a delay to simulate mining effort
 
     def transfer(self, sender: str, recipient: str, amount: float, memo: Optional[str] = None) -> TokenTransaction:
-        """Transfer tokens from sender to recipient with mining complexity"""
-        self._validate_transfer(sender, amount)
-        
-        # Perform proof of work before allowing the transfer
-        if not self._proof_of_work(sender, amount):
-            raise ValueError("Failed proof of work.")
-        
-        # Create recipient account if it doesn't exist
-        if recipient not in self.balances:
-            self.create_account(recipient)
-        
-        # Execute transfer
-        self.balances[sender] -= amount
-        self.balances[recipient] += amount
-        
-        # Lock recipient's account temporarily (e.g., 5 seconds)
-        self.account_locks[recipient] = datetime.now() + timedelta(seconds=5)
-        
-        # Record transaction
+        """Accept a transfer into the pending pool; balances move once it is mined.
+
+        Safe to call from several threads: only the sender's state is
+        touched, under its mutex, so transfers from different senders do
+        not wait for each other.
+        """
         timestamp = datetime.now()
         transaction_hash = self._create_transaction_hash(sender, recipient, amount, timestamp)
-        
         transaction = TokenTransaction(
             sender=sender,
             recipient=recipient,
@@ -117,23 +229,194 @@ class TokenSystem:
             transaction_hash=transaction_hash,
             memo=memo
         )
-        self.token_transactions.append(transaction)
-        
+
+        with self._locked(sender):
+            self._validate_transfer(sender, amount)
+            # Reserve the funds so later transfers cannot spend them twice
+            self.pending_outgoing[sender] = self.pending_outgoing.get(sender, 0.0) + amount
+        with self._ledger_lock:
+            self.pending_transactions[transaction_hash] = transaction
+            self.transactions_by_hash[transaction_hash] = transaction
+
         return transaction
 
-def valid_hash_proof(guess_hash: str) -> bool:
-    """Check if hash meets difficulty requirement (4 leading zeros)"""
-    return guess_hash[:4] == "0000"
+    def next_batch(self) -> List[TokenTransaction]:
+        """Take up to max_batch_size of the oldest pending transfers"""
+        with self._ledger_lock:
+            return list(itertools.islice(self.pending_transactions.values(), self.max_batch_size))
+
+    def confirm_batch(self, batch: List[TokenTransaction], batch_hash: str, nonce: int):
+        """Apply a mined batch of transfers to the balances"""
+        for transaction in batch:
+            sender, recipient, amount = transaction.sender, transaction.recipient, transaction.amount
+            with self._locked(sender, recipient):
+                self.pending_outgoing[sender] -= amount
+                if self.pending_outgoing[sender] <= 1e-9:
+                    del self.pending_outgoing[sender]
+
+                # Create recipient account if it doesn't exist
+                if recipient not in self.balances:
+                    self._open_account(recipient)
+
+                # Execute transfer
+                self.balances[sender] -= amount
+                self.balances[recipient] += amount
+
+                # Lock recipient's account temporarily; it cannot send until then
+                self.account_locks[recipient] = datetime.now() + timedelta(seconds=self.recipient_lock_seconds)
+
+            transaction.status = TransferStatus.CONFIRMED
+            transaction.batch_hash = batch_hash
+            transaction.nonce = nonce
+            with self._ledger_lock:
+                del self.pending_transactions[transaction.transaction_hash]
+                self._record_confirmed(transaction)
+                if self.store is not None:
+                    self.store.append({
+                        'kind': 'transfer',
+                        'sender': sender,
+                        'recipient': recipient,
+                        'amount': amount,
+                        'timestamp': transaction.timestamp.isoformat(),
+                        'transaction_hash': transaction.transaction_hash,
+                        'memo': transaction.memo,
+                        'batch_hash': batch_hash,
+                        'nonce': nonce,
+                    }, transaction.transaction_hash)
+
+    def mine_pending(self) -> int:
+        """Mine and confirm one batch of pending transfers synchronously"""
+        batch = self.next_batch()
+        if not batch:
+            return 0
+        batch_hash = self._batch_hash(batch)
+        nonce = self._proof_of_work(batch_hash)
+        self.confirm_batch(batch, batch_hash, nonce)
+        return len(batch)
+
+    async def run_miner(self, interval: float = 1.0):
+        """Background task: mine pending transfers in batches off the event loop"""
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                await asyncio.sleep(interval)
+                continue
+            batch_hash = self._batch_hash(batch)
+            nonce = await asyncio.to_thread(self._proof_of_work, batch_hash)
+            self.confirm_batch(batch, batch_hash, nonce)
+            print(f"Mined {len(batch)} transfers with nonce {nonce}. Batch: {batch_hash}")
+
+    def get_transaction(self, transaction_hash: str) -> Optional[TokenTransaction]:
+        """Look up a pending or confirmed transfer by hash"""
+        return self.transactions_by_hash.get(transaction_hash)
+
+    def _record_confirmed(self, transaction: TokenTransaction):
+        """Append a confirmed transfer and index it by sender and recipient"""
+        position = len(self.token_transactions)
+        self.token_transactions.append(transaction)
+        self.transaction_positions[transaction.transaction_hash] = position
+        for address in {transaction.sender, transaction.recipient}:
+            self.address_index.setdefault(address, array('q')).append(position)
+
+    def transactions_for(self, address: str, limit: int = 10,
+                         before: Optional[str] = None, after: Optional[str] = None) -> List[TokenTransaction]:
+        """Confirmed transfers touching an address, newest first.
 
-def valid_proof(last_proof: int, proof: int, last_hash: str) -> bool:
+        `before` and `after` are transaction hashes used as cursors: pass the
+        last hash of a page as `before` to get the next (older) page, or the
+        first hash as `after` to get the previous (newer) one.
+        """
+        positions = self.address_index.get(address, array('q'))
+        return [self.token_transactions[p] for p in page_positions(
+            positions, limit,
+            self.transaction_positions.get(before) if before else None,
+            self.transaction_positions.get(after) if after else None,
+            before is not None, after is not None,
+        )]
+
+def page_positions(positions: Sequence, limit: int, before, after,
+                   has_before: bool = False, has_after: bool = False) -> List:
+    """Newest-first page of a sorted position list, bounded by cursor positions.
+
+    An unknown cursor (has_* set but position None) yields an empty page.
+    """
+    if (has_before and before is None) or (has_after and after is None):
+        return []
+    high = bisect.bisect_left(positions, before) if has_before else len(positions)
+    low = bisect.bisect_right(positions, after) if has_after else 0
+    if has_after and not has_before:
+        # Paging towards newer entries: take the ones just after the cursor
+        high = min(high, low + limit)
+    low = max(low, high - limit)
+    return positions[low:high][::-1]
+
+def valid_hash_proof(guess_hash: str, difficulty: int = 4) -> bool:
+    """Check if hash meets difficulty requirement (4 leading zeros by default)"""
+    return guess_hash[:difficulty] == "0" * difficulty
+
+def valid_proof(last_proof: int, proof: int, last_hash: str, difficulty: int = 4) -> bool:
     """Validate proof of work"""
     guess = f"{last_proof}{proof}{last_hash}".encode()
-    return valid_hash_proof(hashlib.sha256(guess).hexdigest())
+    return valid_hash_proof(hashlib.sha256(guess).hexdigest(), difficulty)
+
+# A transaction's location in the chain, (block position, offset in block),
+# packed into one int so the indexes can hold plain arrays of them; packed
+# locations sort in chain order
+LOCATION_BITS = 32
+
+
+def pack_location(position: int, offset: int) -> int:
+    return (position << LOCATION_BITS) | offset
+
+
+def unpack_location(location: int) -> Tuple[int, int]:
+    return location >> LOCATION_BITS, location & ((1 << LOCATION_BITS) - 1)
+
+# Fields covered by a block's hash; transactions are committed to through merkle_root
+HEADER_FIELDS = ('index', 'timestamp', 'merkle_root', 'transaction_count', 'proof', 'previous_hash')
+
+# Fixed so that independently started nodes share block 0 and can sync
+# just the blocks after their common ancestor
+GENESIS_TIMESTAMP = 1704067200.0  # 2024-01-01T00:00:00Z
+
+
+class StaleTip(Exception):
+    """Raised when a block was mined on a tip that is no longer the chain's tip"""
 
 class RecycleChain:
-    def __init__(self):
-        self.chain = []
-        self.current_transactions = []
+    def __init__(self, difficulty: int = 4, mining_workers: Optional[int] = None, store: Optional[BlockStore] = None,
+                 eis_engine: Optional["EISEngine"] = None, mempool: Optional[Mempool] = None,
+                 max_block_transactions: int = 500):
+        self.store = store
+        # Loaded on first use, see the eis_engine property
+        self._eis_engine = eis_engine
+        # Guards the mempool, block creation and chain replacement
+        self._lock = threading.Lock()
+        if store is not None:
+            # Blocks are paged in from the store on demand
+            self.chain = store.records()
+            self.block_hashes = store.digests()
+        else:
+            self.chain = []
+            # Hash of each block in self.chain, computed once when it is appended
+            self.block_hashes: List[str] = []
+        # Number of leading blocks already checked by validate(); blocks
+        # loaded from our own store were validated before they were written
+        self.validated_upto = len(self.chain)
+        # Sealed e-waste transactions per sender/recipient as packed locations,
+        # built lazily from the blocks not yet indexed
+        self.address_transactions: Dict[str, array] = {}
+        self.transaction_locations: Dict[str, int] = {}
+        self._indexed_upto = 0
+        self.difficulty = difficulty
+        self.miner = ParallelMiner(workers=mining_workers)
+        # Transactions waiting for the next block
+        self.mempool = mempool or Mempool()
+        self.max_block_transactions = max_block_transactions
+        # Called with (block, block_hash) after a block is appended, and with the
+        # new length after blocks are dropped for a fork (e.g. by MongoMirror)
+        self.block_sealed_hooks: List[Callable[[Dict, str], None]] = []
+        self.chain_truncated_hooks: List[Callable[[int], None]] = []
         self.nodes: Set[str] = set()
         self.recycling_rewards = {
             'CIRCUIT_BOARDS': 2,
@@ -145,7 +428,15 @@ class RecycleChain:
         }
         
         # Create genesis block
-        self.new_block(previous_hash="1", proof=100)
+        if not self.chain:
+            self._append_block(self.genesis_block())
+
+    @property
+    def eis_engine(self) -> "EISEngine":
+        if self._eis_engine is None:
+            from Python.EISEngine import get_engine
+            self._eis_engine = get_engine()
+        return self._eis_engine
 
     def register_node(self, address: str) -> None:
         """Add a new node to the list of nodes"""
@@ -157,65 +448,152 @@ class RecycleChain:
         else:
             raise ValueError("Invalid URL")
 
-    def new_block(self, proof: int, previous_hash: str) -> Dict:
-        """Create a new block in the blockchain"""
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': time.time(),
-            'transactions': self.current_transactions,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1])
-        }
-        
-        self.current_transactions = []
-        self.chain.append(block)
+    def new_block(self, proof: int, previous_hash: str, extra_transactions: Optional[List[Dict]] = None) -> Dict:
+        """Create a new block from the oldest pending transactions.
+
+        Raises StaleTip if previous_hash is given and the tip has changed
+        since, e.g. because the chain was replaced while a proof was mined.
+        """
+        with self._lock:
+            # Checked before taking transactions so nothing leaves the mempool
+            if previous_hash and self.chain and previous_hash != self.block_hashes[-1]:
+                raise StaleTip(f"Tip moved from {previous_hash} to {self.block_hashes[-1]}")
+            transactions = self.mempool.take(self.max_block_transactions) + (extra_transactions or [])
+            block = {
+                'index': len(self.chain) + 1,
+                'timestamp': time.time(),
+                'transactions': transactions,
+                'merkle_root': self.merkle_root_of(transactions),
+                'transaction_count': len(transactions),
+                'proof': proof,
+                'previous_hash': previous_hash or self.block_hashes[-1]
+            }
+
+            self._append_block(block)
         return block
 
+    @classmethod
+    def genesis_block(cls) -> Dict:
+        """The genesis block, identical on every node"""
+        return {
+            'index': 1,
+            'timestamp': GENESIS_TIMESTAMP,
+            'transactions': [],
+            'merkle_root': cls.merkle_root_of([]),
+            'transaction_count': 0,
+            'proof': 100,
+            'previous_hash': "1"
+        }
+
+    def _append_block(self, block: Dict, block_hash: Optional[str] = None):
+        """Append a block and its hash to memory or the block store"""
+        block_hash = block_hash or self.hash(block)
+        if self.store is not None:
+            self.store.append(block, block_hash)
+        else:
+            self.chain.append(block)
+            self.block_hashes.append(block_hash)
+        for hook in self.block_sealed_hooks:
+            hook(block, block_hash)
+
     def add_transaction(self, 
                        sender: str, 
                        recipient: str, 
                        ewaste_items: List[EWasteItem],
                        transaction_type: str,
-                       status: EWasteStatus) -> int:
-        """Add a new transaction to the list of transactions"""
-        from Python.EISnumeric import Using
+                       status: EWasteStatus) -> Tuple[int, bool]:
+        """Add a new transaction to the mempool.
+
+        Returns the next block index and False if the transaction was a
+        duplicate of one already pending. Raises MempoolFull when the
+        mempool is at capacity.
+        """
+        transaction = self._build_transaction(
+            sender, recipient, ewaste_items, transaction_type, status,
+            sum(self.eis_engine.score_items(ewaste_items))
+        )
+        
+        with self._lock:
+            added = self.mempool.add(transaction)
+            return self.last_block['index'] + 1, added
+
+    def add_transactions(self, transactions: List[TransactionModel]) -> Tuple[int, List[bool]]:
+        """Add many transactions at once, scoring all their e-waste items in one batch.
+
+        Returns the next block index and, per transaction, False if it was a
+        duplicate of one already pending. Raises MempoolFull if the batch
+        does not fit.
+        """
+        items = [item for transaction in transactions for item in transaction.ewaste_items]
+        scores = iter(self.eis_engine.score_items(items))
+
+        built = []
+        for transaction in transactions:
+            eis = sum(next(scores) for _ in transaction.ewaste_items)
+            built.append(self._build_transaction(
+                transaction.sender, transaction.recipient, transaction.ewaste_items,
+                transaction.transaction_type, transaction.status, eis
+            ))
+
+        with self._lock:
+            added = self.mempool.add_many(built)
+            return self.last_block['index'] + 1, added
 
-        transaction = {
-            'sender': sender,
-            'recipient': recipient,
+    def _build_transaction(self, sender: str, recipient: str, ewaste_items: List[EWasteItem],
+                           transaction_type: str, status: EWasteStatus, eis: float) -> Dict:
+        return {
+            'sender': sys.intern(sender),
+            'recipient': sys.intern(recipient),
             'timestamp': time.time(),
-            'type': transaction_type,
+            'type': sys.intern(transaction_type),
             'status': status.value,
-            'ewaste_items': [vars(item) for item in ewaste_items],
-            'EIS': Using(),
+            'ewaste_items': [self._item_record(item) for item in ewaste_items],
+            'EIS': eis,
             'reward': self.calculate_rewards(ewaste_items)
         }
-        
-        self.current_transactions.append(transaction)
-        return self.last_block['index'] + 1
 
-    
+    @staticmethod
+    def _item_record(item: EWasteItem) -> Dict:
+        """An e-waste item as stored in a block, sharing its repeated strings"""
+        record = asdict(item)
+        record['type'] = sys.intern(record['type'])
+        record['manufacturer'] = sys.intern(record['manufacturer'])
+        record['components'] = [sys.intern(component) for component in record['components']]
+        return record
+
+
     @property
     def last_block(self) -> Dict:
         """Get the last block in the chain"""
         return self.chain[-1] if self.chain else None
 
+    @staticmethod
+    def header(block: Dict) -> Dict:
+        """The block without its transactions"""
+        return {field: block[field] for field in HEADER_FIELDS}
+
     @staticmethod
     def hash(block: Dict) -> str:
-        """Create a SHA-256 hash of a block"""
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        """Create a SHA-256 hash of a block header"""
+        return hashlib.sha256(encode_block_header(block)).hexdigest()
+
+    @staticmethod
+    def merkle_root_of(transactions: List[Dict]) -> str:
+        """Merkle root over the hashes of a block's transactions"""
+        return merkle_root([RecycleChain.transaction_hash(transaction) for transaction in transactions])
+
+    def valid_body(self, block: Dict) -> bool:
+        """Check that a block's transactions match its header"""
+        return (block['transaction_count'] == len(block['transactions'])
+                and block['merkle_root'] == self.merkle_root_of(block['transactions']))
 
     def proof_of_work(self, last_block: Dict) -> int:
         """Calculate the proof of work for mining"""
         last_proof = last_block['proof']
-        last_hash = self.hash(last_block)
-        
-        proof = 0
-        while not valid_proof(last_proof, proof, last_hash):
-            proof += 1
-            
-        return proof
+        last_hash = self.block_hashes[-1] if last_block is self.last_block else self.hash(last_block)
+
+        # The proof sits between last_proof and last_hash in the hashed string
+        return self.miner.search(f"{last_proof}".encode(), last_hash.encode(), self.difficulty)
 
     async def async_proof_of_work(self, last_block: Dict) -> int:
         """Asynchronously calculate the proof of work"""
@@ -223,75 +601,298 @@ class RecycleChain:
 
     def valid_chain(self, chain: List[Dict]) -> bool:
         """Check if a blockchain is valid"""
-        last_block = chain[0]
-        current_index = 1
-        
-        while current_index < len(chain):
-            block = chain[current_index]
-            last_block_hash = self.hash(last_block)
-            
+        return self._follows(chain[0], self.hash(chain[0]), chain[1:]) is not None
+
+    def _follows(self, last_block: Dict, last_block_hash: str, blocks: List[Dict]) -> Optional[List[str]]:
+        """Check that blocks extend last_block; return their hashes, or None if invalid"""
+        hashes = []
+        for block in blocks:
+            # Check hash link
+            if block['previous_hash'] != last_block_hash:
+                return None
+
+            # Check proof of work
+            if not valid_proof(last_block['proof'], block['proof'], last_block_hash, self.difficulty):
+                return None
+
+            # Check the transactions against the Merkle root
+            if not self.valid_body(block):
+                return None
+
+            last_block = block
+            last_block_hash = self.hash(block)
+            hashes.append(last_block_hash)
+
+        return hashes
+
+    def validate(self, full: bool = False) -> bool:
+        """Validate the local chain.
+
+        By default only blocks appended since the last successful call are
+        checked, using the cached block hashes. With full=True every block is
+        rehashed and checked from genesis, for audits.
+        """
+        if full:
+            for block, cached_hash in zip(self.chain, self.block_hashes):
+                if self.hash(block) != cached_hash or not self.valid_body(block):
+                    return False
+            if not self.valid_chain(self.chain):
+                return False
+            self.validated_upto = len(self.chain)
+            return True
+
+        for position in range(max(self.validated_upto, 1), len(self.chain)):
+            block = self.chain[position]
+            last_block_hash = self.block_hashes[position - 1]
+
             # Check hash link
             if block['previous_hash'] != last_block_hash:
                 return False
-                
+
             # Check proof of work
-            if not valid_proof(last_block['proof'], block['proof'], last_block_hash):
+            if not valid_proof(self.chain[position - 1]['proof'], block['proof'], last_block_hash, self.difficulty):
                 return False
-                
-            last_block = block
-            current_index += 1
-            
+
+            # Check the transactions against the Merkle root
+            if not self.valid_body(block):
+                return False
+
+            self.validated_upto = position + 1
+
+        self.validated_upto = max(self.validated_upto, len(self.chain))
         return True
 
+    def replace_suffix(self, start: int, blocks: List[Dict], hashes: List[str]):
+        """Replace every block from position start onwards with already validated blocks"""
+        # Under the block lock so new_block sees either the old tip or the new one
+        with self._lock:
+            if start < self._indexed_upto:
+                self.address_transactions = {}
+                self.transaction_locations = {}
+                self._indexed_upto = 0
+            if self.store is not None:
+                self.store.truncate(start)
+            else:
+                del self.chain[start:]
+                del self.block_hashes[start:]
+            for hook in self.chain_truncated_hooks:
+                hook(start)
+            for block, block_hash in zip(blocks, hashes):
+                self._append_block(block, block_hash)
+            self.validated_upto = len(self.chain)
 
-    async def resolve_conflicts(self) -> bool:
-        """Consensus algorithm: resolve conflicts by replacing the chain with the longest valid chain."""
-        neighbours = self.nodes
-        new_chain = None
-        max_length = len(self.chain)
-        
-        async with httpx.AsyncClient() as client:
-            for node in neighbours:
-                try:
-                    response = await client.get(f"http://{node}/chain")
-                    if response.status_code == 200:
-                        response_json = response.json()
-                        length = response_json['length']
-                        chain = response_json['chain']
-                        
-                        if length > max_length and self.valid_chain(chain):
-                            max_length = length
-                            new_chain = chain
-                except httpx.RequestError as e:
-                    print(f"Request failed for node {node}: {e}")
-        
-        if new_chain:
-            self.chain = new_chain
-            return True
-        
-        return False
+    @staticmethod
+    def transaction_hash(transaction: Dict) -> str:
+        """Create a SHA-256 hash of a transaction"""
+        return hashlib.sha256(json.dumps(transaction, sort_keys=True).encode()).hexdigest()
 
+    def _index_blocks(self):
+        """Index the transactions of blocks sealed since the last lookup"""
+        for position in range(self._indexed_upto, len(self.chain)):
+            for offset, transaction in enumerate(self.chain[position]['transactions']):
+                location = pack_location(position, offset)
+                self.transaction_locations[self.transaction_hash(transaction)] = location
+                for address in {transaction.get('sender'), transaction.get('recipient')}:
+                    self.address_transactions.setdefault(address, array('q')).append(location)
+        self._indexed_upto = len(self.chain)
 
-    async def mine_block(self, miner_address: str) -> Dict:
-        """Mine a new block"""
-        # Calculate proof of work
-        last_block = self.last_block
-        proof = await self.async_proof_of_work(last_block)
-        
-        # Add mining reward transaction
-        self.add_transaction(
-            sender="0",
-            recipient=miner_address,
-            ewaste_items=[],
-            transaction_type="mining_reward",
-            status=EWasteStatus.PROCESSED
+    def transactions_for(self, address: str, limit: int = 10,
+                         before: Optional[str] = None, after: Optional[str] = None) -> List[Dict]:
+        """Sealed e-waste transactions touching an address, newest first.
+
+        `before` and `after` are transaction hashes used as cursors, as in
+        TokenSystem.transactions_for.
+        """
+        self._index_blocks()
+        locations = page_positions(
+            self.address_transactions.get(address, array('q')), limit,
+            self.transaction_locations.get(before) if before else None,
+            self.transaction_locations.get(after) if after else None,
+            before is not None, after is not None,
         )
-        
-        # Create new block
-        previous_hash = self.hash(last_block)
-        block = self.new_block(proof, previous_hash)
-        
-        return block
+        page = []
+        for location in locations:
+            position, offset = unpack_location(location)
+            block = self.chain[position]
+            transaction = block['transactions'][offset]
+            page.append({**transaction, 'hash': self.transaction_hash(transaction), 'block_index': block['index']})
+        return page
+
+    def transaction_proof(self, transaction_hash: str) -> Optional[Dict]:
+        """Merkle inclusion proof for a sealed transaction.
+
+        The path leads from the transaction hash to the block's merkle_root,
+        which is part of the block header; verify it with
+        blockchain.merkle.verify_merkle_path.
+        """
+        self._index_blocks()
+        location = self.transaction_locations.get(transaction_hash)
+        if location is None:
+            return None
+        position, offset = unpack_location(location)
+        block = self.chain[position]
+        leaves = [self.transaction_hash(transaction) for transaction in block['transactions']]
+        return {
+            'transaction_hash': transaction_hash,
+            'block_hash': self.block_hashes[position],
+            'header': self.header(block),
+            'path': merkle_path(leaves, offset),
+        }
+
+    def tip(self) -> Dict:
+        """Length and tip hash, used by peers to decide whether to sync"""
+        return {'length': len(self.chain), 'tip_hash': self.block_hashes[-1]}
+
+    async def _peer_tip(self, client, node: str, timeout: float) -> Optional[Dict]:
+        import httpx
+        try:
+            response = await asyncio.wait_for(client.get(f"http://{node}/chain/tip"), timeout)
+            if response.status_code == 200:
+                return response.json()
+        except (httpx.RequestError, asyncio.TimeoutError) as e:
+            print(f"Request failed for node {node}: {e!r}")
+        return None
+
+    async def _peer_blocks(self, client, node: str, from_index: int, limit: int, timeout: float) -> List[Dict]:
+        response = await asyncio.wait_for(
+            client.get(f"http://{node}/chain", params={'from_index': from_index, 'limit': limit}),
+            timeout
+        )
+        response.raise_for_status()
+        return response.json()['chain']
+
+    async def _common_ancestor(self, client, node: str, peer_length: int, timeout: float) -> int:
+        """Position of the last block we share with a peer, or -1 if none"""
+        async def matches(position: int) -> bool:
+            blocks = await self._peer_blocks(client, node, position, 1, timeout)
+            return bool(blocks) and self.hash(blocks[0]) == self.block_hashes[position]
+
+        # Probe backwards from our tip in growing steps until a shared block is found
+        mismatch = min(len(self.chain), peer_length)
+        position, step = mismatch - 1, 1
+        while position >= 0 and not await matches(position):
+            mismatch = position
+            position -= step
+            step *= 2
+        if position < 0:
+            if mismatch == 0 or not await matches(0):
+                return -1
+            position = 0
+
+        # Chains never re-converge after a fork, so binary search the gap
+        low, high = position, mismatch
+        while high - low > 1:
+            middle = (low + high) // 2
+            if await matches(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    async def _sync_from(self, client, node: str, peer_length: int, timeout: float, page_size: int) -> bool:
+        """Download and adopt the part of a longer peer chain that we lack"""
+        ancestor = await self._common_ancestor(client, node, peer_length, timeout)
+
+        suffix = []
+        position = ancestor + 1
+        while position < peer_length:
+            page = await self._peer_blocks(client, node, position, page_size, timeout)
+            if not page:
+                break
+            suffix.extend(page)
+            position += len(page)
+        if ancestor + 1 + len(suffix) <= len(self.chain):
+            return False
+
+        # Validate only the downloaded suffix against the shared ancestor
+        if ancestor < 0:
+            if not suffix:
+                return False
+            hashes = self._follows(suffix[0], self.hash(suffix[0]), suffix[1:])
+            if hashes is not None:
+                hashes.insert(0, self.hash(suffix[0]))
+        else:
+            hashes = self._follows(self.chain[ancestor], self.block_hashes[ancestor], suffix)
+        if hashes is None:
+            print(f"Node {node} sent an invalid chain")
+            return False
+
+        self.replace_suffix(ancestor + 1, suffix, hashes)
+        return True
+
+    async def resolve_conflicts(self, client=None, timeout: float = 5.0, page_size: int = 500) -> bool:
+        """Consensus algorithm: resolve conflicts by adopting the longest valid chain.
+
+        Every neighbour is asked for its tip concurrently. Only peers with a
+        longer chain are synced from, longest first, and from each only the
+        blocks after the last shared block are downloaded and validated.
+        """
+        # Only needed for consensus, so not loaded with the module
+        import httpx
+        if client is None:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                return await self.resolve_conflicts(client, timeout, page_size)
+
+        neighbours = list(self.nodes)
+        tips = await asyncio.gather(*(self._peer_tip(client, node, timeout) for node in neighbours))
+        candidates = sorted(
+            ((tip['length'], node) for node, tip in zip(neighbours, tips)
+             if tip and tip['length'] > len(self.chain)),
+            reverse=True
+        )
+
+        for length, node in candidates:
+            try:
+                if await self._sync_from(client, node, length, timeout, page_size):
+                    return True
+            except (httpx.HTTPError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                print(f"Request failed for node {node}: {e!r}")
+
+        return False
+
+
+    async def mine_block(self, miner_address: str, attempts: int = 3) -> Dict:
+        """Mine a new block, starting over if the tip changes while mining"""
+        for attempt in range(attempts):
+            # Calculate proof of work
+            last_block = self.last_block
+            previous_hash = self.block_hashes[-1]
+            proof = await self.async_proof_of_work(last_block)
+
+            # Mining reward transaction, added directly so a full mempool cannot block it
+            reward = self._build_transaction(
+                sender="0",
+                recipient=miner_address,
+                ewaste_items=[],
+                transaction_type="mining_reward",
+                status=EWasteStatus.PROCESSED,
+                eis=0
+            )
+
+            # Create new block
+            try:
+                return self.new_block(proof, previous_hash, [reward])
+            except StaleTip:
+                if attempt == attempts - 1:
+                    raise
+
+    async def run_sealer(self, miner_address: str, max_transactions: int = 500,
+                         interval: float = 30.0, poll: float = 0.5):
+        """Background task: seal a block once max_transactions are pending or
+        interval seconds have passed with anything pending"""
+        last_seal = time.monotonic()
+        while True:
+            await asyncio.sleep(poll)
+            pending = len(self.mempool)
+            if pending >= max_transactions or (pending and time.monotonic() - last_seal >= interval):
+                try:
+                    block = await self.mine_block(miner_address)
+                    print(f"Sealed block {block['index']} with {len(block['transactions'])} transactions")
+                except Exception as e:
+                    print(f"Failed to seal block: {e}")
+                last_seal = time.monotonic()
+            elif not pending:
+                last_seal = time.monotonic()
 
     def calculate_rewards(self, ewaste_items: List[EWasteItem]) -> float:
         """Calculate recycling rewards based on e-waste components"""
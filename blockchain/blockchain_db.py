@@ -0,0 +1,213 @@
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Dict, Optional
+
+
+# Each record in the data file is a 4-byte big-endian length followed by JSON
+RECORD_HEADER = struct.Struct(">I")
+# Each index entry is the record's offset in the data file and its raw SHA-256 digest
+INDEX_ENTRY = struct.Struct(">Q32s")
+
+
+class BlockStore:
+    """Append-only, length-prefixed record log with a fixed-width offset index.
+
+    Opening a store only reads the index (40 bytes per record); records are
+    read through a memory map of the data file when they are first accessed
+    and kept in a small LRU cache. Appends are flushed to the OS straight
+    away but only fsync'd every `fsync_every` records or `fsync_interval`
+    seconds, whichever comes first. append() can only check the interval
+    when it is called, so run_syncer() fsyncs the tail of a burst once the
+    interval has passed without further appends.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 64, fsync_interval: float = 1.0, cache_size: int = 1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.cache_size = cache_size
+
+        self._data = open(os.path.join(path, "blocks.log"), "a+b")
+        self._index = open(os.path.join(path, "blocks.idx"), "a+b")
+        self._index.seek(0)
+        self._entries = bytearray(self._index.read())
+        self._recover()
+
+        self._mmap: Optional[mmap.mmap] = None
+        self._cache: "OrderedDict[int, Dict]" = OrderedDict()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _recover(self):
+        """Drop a partially written tail left behind by a crash."""
+        whole = len(self._entries) - len(self._entries) % INDEX_ENTRY.size
+        data_size = os.fstat(self._data.fileno()).st_size
+
+        # Keep only index entries whose record is fully present in the data file
+        count = whole // INDEX_ENTRY.size
+        end = 0
+        while count:
+            offset, _ = INDEX_ENTRY.unpack_from(self._entries, (count - 1) * INDEX_ENTRY.size)
+            if offset + RECORD_HEADER.size <= data_size:
+                self._data.seek(offset)
+                (length,) = RECORD_HEADER.unpack(self._data.read(RECORD_HEADER.size))
+                end = offset + RECORD_HEADER.size + length
+                if end <= data_size:
+                    break
+            count -= 1
+            end = 0
+
+        del self._entries[count * INDEX_ENTRY.size:]
+        if os.fstat(self._index.fileno()).st_size != len(self._entries):
+            self._index.truncate(len(self._entries))
+        if data_size != end:
+            self._data.truncate(end)
+
+    def __len__(self) -> int:
+        return len(self._entries) // INDEX_ENTRY.size
+
+    def _entry(self, position: int):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("block store index out of range")
+        return position, INDEX_ENTRY.unpack_from(self._entries, position * INDEX_ENTRY.size)
+
+    def append(self, record: Dict, digest: str) -> int:
+        """Append a record with its hex SHA-256 digest and return its position."""
+        payload = json.dumps(record).encode()
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        self._data.write(RECORD_HEADER.pack(len(payload)) + payload)
+        self._data.flush()
+
+        entry = INDEX_ENTRY.pack(offset, bytes.fromhex(digest))
+        self._index.write(entry)
+        self._index.flush()
+        self._entries += entry
+
+        position = len(self) - 1
+        self._remember(position, record)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        return position
+
+    def get(self, position: int) -> Dict:
+        """Read a record, paging it in from the data file if it is not cached."""
+        position, (offset, _) = self._entry(position)
+        record = self._cache.get(position)
+        if record is not None:
+            self._cache.move_to_end(position)
+            return record
+
+        if self._mmap is None or offset + RECORD_HEADER.size > len(self._mmap):
+            self._remap()
+        (length,) = RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > len(self._mmap):
+            self._remap()
+        record = json.loads(self._mmap[start:start + length])
+        self._remember(position, record)
+        return record
+
+    def digest(self, position: int) -> str:
+        """Return the hex digest stored for a record."""
+        _, (_, digest) = self._entry(position)
+        return digest.hex()
+
+    def _remember(self, position: int, record: Dict):
+        self._cache[position] = record
+        self._cache.move_to_end(position)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _remap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def truncate(self, length: int):
+        """Drop every record from position `length` onwards."""
+        if length >= len(self):
+            return
+        end = self._entry(length)[1][0]
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        del self._entries[length * INDEX_ENTRY.size:]
+        self._data.truncate(end)
+        self._index.truncate(len(self._entries))
+        for position in [p for p in self._cache if p >= length]:
+            del self._cache[position]
+        self.sync()
+
+    def sync_if_due(self):
+        """fsync if records have waited at least fsync_interval seconds."""
+        if self._unsynced and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    async def run_syncer(self):
+        """Background task: apply fsync_interval between appends until cancelled."""
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            try:
+                self.sync_if_due()
+            except (OSError, ValueError) as e:
+                print(f"Failed to sync block store {self.path}: {e}")
+
+    def sync(self):
+        """Force appended records to disk."""
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._data.close()
+        self._index.close()
+
+    def records(self) -> "StoredRecords":
+        """Read-only list-like view of the records"""
+        return StoredRecords(self)
+
+    def digests(self) -> "StoredDigests":
+        """Read-only list-like view of the record digests"""
+        return StoredDigests(self)
+
+
+class StoredRecords(Sequence):
+    def __init__(self, store: BlockStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.store.get(i) for i in range(*position.indices(len(self.store)))]
+        return self.store.get(position)
+
+
+class StoredDigests(Sequence):
+    def __init__(self, store: BlockStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.store.digest(i) for i in range(*position.indices(len(self.store)))]
+        return self.store.digest(position)
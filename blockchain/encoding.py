@@ -0,0 +1,110 @@
+import struct
+from datetime import datetime
+from enum import Enum
+
+# Canonical binary encoding used for hashing blocks and transactions.
+#
+# Every value is a one-byte type tag followed by its payload; strings,
+# bytes and containers are length-prefixed and dict entries are sorted by
+# key, so equal values always encode to the same bytes and no two distinct
+# values share an encoding. Floats are encoded as IEEE 754 doubles, so
+# values round-trip exactly, unlike a decimal text representation.
+
+_pack_double = struct.Struct(">d").pack
+_pack_length = struct.Struct(">I").pack
+
+
+def _encode_str(value: str) -> bytes:
+    data = value.encode()
+    return b"s" + _pack_length(len(data)) + data
+
+
+def _encode(value, out: list):
+    # bool is checked before int since it is a subclass of int
+    if value is None:
+        out.append(b"n")
+    elif value is True:
+        out.append(b"t")
+    elif value is False:
+        out.append(b"f")
+    elif isinstance(value, str):
+        out.append(_encode_str(value))
+    elif isinstance(value, int):
+        out.append(b"i" + _encode_str(str(value))[1:])
+    elif isinstance(value, float):
+        out.append(b"d" + _pack_double(value))
+    elif isinstance(value, dict):
+        out.append(b"m" + _pack_length(len(value)))
+        for key in sorted(value):
+            if not isinstance(key, str):
+                raise TypeError(f"Cannot encode dict key of type {type(key).__name__}")
+            out.append(_encode_str(key))
+            _encode(value[key], out)
+    elif isinstance(value, (list, tuple)):
+        out.append(b"l" + _pack_length(len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(b"b" + _pack_length(len(value)) + bytes(value))
+    elif isinstance(value, datetime):
+        out.append(b"T" + _encode_str(value.isoformat())[1:])
+    elif isinstance(value, Enum):
+        _encode(value.value, out)
+    else:
+        raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def encode(value) -> bytes:
+    """Canonical bytes for a JSON-like value (dicts, lists, str, numbers, None,
+    plus bytes, datetimes and enums)."""
+    out = []
+    _encode(value, out)
+    return b"".join(out)
+
+
+def encode_fields(*values) -> bytes:
+    """Canonical bytes for a fixed sequence of fields."""
+    out = []
+    for value in values:
+        _encode(value, out)
+    return b"".join(out)
+
+
+# index, timestamp, transaction_count, proof, merkle_root; previous_hash
+# follows as a length-prefixed string since the genesis block's is not a digest
+_block_header = struct.Struct(">qdIq32s")
+
+
+def _header_int(header: dict, field: str, bits: int, signed: bool = True) -> int:
+    value = header[field]
+    low, high = (-(1 << (bits - 1)), 1 << (bits - 1)) if signed else (0, 1 << bits)
+    # bool is an int subclass but never a valid header field
+    if type(value) is not int or not low <= value < high:
+        raise ValueError(f"Block header field {field!r} must be a {bits}-bit integer, got {value!r}")
+    return value
+
+
+def encode_block_header(header: dict) -> bytes:
+    """Fixed-layout canonical bytes for a RecycleChain block header.
+
+    Raises ValueError for headers that do not fit the layout, e.g. from a
+    malformed peer block.
+    """
+    timestamp = header['timestamp']
+    if type(timestamp) not in (int, float):
+        raise ValueError(f"Block header field 'timestamp' must be a number, got {timestamp!r}")
+    merkle_root, previous_hash = header['merkle_root'], header['previous_hash']
+    if not isinstance(merkle_root, str) or not isinstance(previous_hash, str):
+        raise ValueError("Block header fields 'merkle_root' and 'previous_hash' must be strings")
+    merkle_root = bytes.fromhex(merkle_root)
+    if len(merkle_root) != 32:
+        raise ValueError(f"Block header field 'merkle_root' must be 32 bytes, got {len(merkle_root)}")
+    previous_hash = previous_hash.encode()
+    return (
+        _block_header.pack(
+            _header_int(header, 'index', 64), float(timestamp),
+            _header_int(header, 'transaction_count', 32, signed=False),
+            _header_int(header, 'proof', 64), merkle_root,
+        )
+        + _pack_length(len(previous_hash)) + previous_hash
+    )
@@ -0,0 +1,96 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class MempoolFull(Exception):
+    """Raised when accepting transactions would exceed the mempool's limits."""
+
+
+def intake_key(transaction: Dict) -> str:
+    """Identity of a submitted transaction, ignoring when it was received.
+
+    Two submissions with the same content (e.g. a client retrying a request)
+    get the same key, so only the first is kept.
+    """
+    content = {k: v for k, v in transaction.items() if k != 'timestamp'}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class Mempool:
+    """Bounded, de-duplicated queue of transactions waiting for a block.
+
+    Limits apply both to the number of transactions and to their total
+    serialised size; once either is reached, new transactions are refused
+    with MempoolFull until a block is sealed.
+    """
+
+    def __init__(self, max_transactions: int = 10_000, max_bytes: int = 16 * 1024 * 1024):
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self._transactions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.bytes = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self):
+        return iter(list(self._transactions.values()))
+
+    def add_many(self, transactions: List[Dict]) -> List[bool]:
+        """Queue transactions, all or none; returns False for each duplicate."""
+        keys = [intake_key(transaction) for transaction in transactions]
+        fresh = OrderedDict()
+        for key, transaction in zip(keys, transactions):
+            if key not in self._transactions and key not in fresh:
+                fresh[key] = (transaction, len(json.dumps(transaction)))
+
+        added_bytes = sum(size for _, size in fresh.values())
+        if (len(self._transactions) + len(fresh) > self.max_transactions
+                or self.bytes + added_bytes > self.max_bytes):
+            self.rejected += len(transactions)
+            raise MempoolFull(
+                f"Mempool is full ({len(self._transactions)} transactions, {self.bytes} bytes)"
+            )
+
+        results = []
+        for key in keys:
+            entry = fresh.pop(key, None)
+            if entry is None:
+                self.duplicates += 1
+                results.append(False)
+                continue
+            self._transactions[key], self._sizes[key] = entry
+            self.bytes += entry[1]
+            results.append(True)
+        return results
+
+    def add(self, transaction: Dict) -> bool:
+        """Queue one transaction; returns False if it is a duplicate."""
+        return self.add_many([transaction])[0]
+
+    def take(self, limit: Optional[int] = None) -> List[Dict]:
+        """Remove and return up to `limit` of the oldest transactions."""
+        taken = []
+        while self._transactions and (limit is None or len(taken) < limit):
+            key, transaction = self._transactions.popitem(last=False)
+            self.bytes -= self._sizes.pop(key)
+            taken.append(transaction)
+        return taken
+
+    def clear(self):
+        self.take()
+
+    def stats(self) -> Dict:
+        return {
+            "transactions": len(self._transactions),
+            "bytes": self.bytes,
+            "max_transactions": self.max_transactions,
+            "max_bytes": self.max_bytes,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+        }
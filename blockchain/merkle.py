@@ -0,0 +1,56 @@
+import hashlib
+from typing import Dict, List
+
+# Internal nodes are hashed with a prefix byte so they can never be
+# confused with a leaf (a transaction hash).
+NODE_PREFIX = b"\x01"
+
+
+def _node(left: str, right: str) -> str:
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level: List[str]) -> List[str]:
+    # An odd node out is paired with itself
+    if len(level) % 2:
+        level = level + [level[-1]]
+    return [_node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+
+
+def merkle_root(leaves: List[str]) -> str:
+    """Merkle root over hex transaction hashes (sha256 of nothing if there are none)."""
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_path(leaves: List[str], index: int) -> List[Dict[str, str]]:
+    """Sibling hashes from leaf `index` up to the root.
+
+    Each step says whether the sibling goes on the left or the right when
+    it is combined with the running hash.
+    """
+    path = []
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        sibling = index ^ 1
+        path.append({"hash": level[sibling], "position": "left" if sibling < index else "right"})
+        level = _next_level(level)
+        index //= 2
+    return path
+
+
+def verify_merkle_path(leaf: str, path: List[Dict[str, str]], root: str) -> bool:
+    """Check that a leaf and its Merkle path lead to the given root."""
+    current = leaf
+    for step in path:
+        if step["position"] == "left":
+            current = _node(step["hash"], current)
+        else:
+            current = _node(current, step["hash"])
+    return current == root
@@ -0,0 +1,116 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+
+
+# Set in each worker process by the pool initializer; tells siblings to stop
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _search(prefix: bytes, suffix: bytes, difficulty: int, start: int, step: int,
+            check_every: int = 10_000, stop_event=None) -> Tuple[Optional[int], int]:
+    """Scan nonces start, start + step, ... for sha256(prefix + nonce + suffix)
+    with `difficulty` leading zero hex digits.
+
+    Returns (nonce, hashes tried), or (None, hashes tried) if a sibling
+    worker found a proof first.
+    """
+    stop = stop_event or _stop_event
+    base = hashlib.sha256(prefix)
+    # Compare raw digest bytes instead of formatting a hex string per attempt
+    zero_bytes = b"\0" * (difficulty // 2)
+    full, odd = len(zero_bytes), difficulty % 2
+
+    nonce = start
+    hashes = 0
+    while True:
+        for _ in range(check_every):
+            attempt = base.copy()
+            attempt.update(str(nonce).encode())
+            attempt.update(suffix)
+            digest = attempt.digest()
+            if digest[:full] == zero_bytes and (not odd or digest[full] < 16):
+                stop.set()
+                return nonce, hashes + 1
+            hashes += 1
+            nonce += step
+        if stop.is_set():
+            return None, hashes
+
+
+class ParallelMiner:
+    """Proof-of-work nonce search spread across worker processes.
+
+    Worker i tries nonces i, i + W, i + 2W, ... so together they cover the
+    nonce space without overlap. The first worker to find a proof sets a
+    shared event and its siblings stop at their next check.
+    """
+
+    def __init__(self, workers: Optional[int] = None, check_every: int = 10_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.check_every = check_every
+        self.last_stats: Dict = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stop_event = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._stop_event = context.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._stop_event,),
+            )
+
+    def search(self, prefix: bytes, suffix: bytes, difficulty: int) -> int:
+        """Find a nonce such that sha256(prefix + str(nonce) + suffix) meets the difficulty"""
+        with self._lock:
+            start = time.perf_counter()
+            if self.workers == 1:
+                nonce, hashes = _search(prefix, suffix, difficulty, 0, 1,
+                                        self.check_every, threading.Event())
+            else:
+                nonce, hashes = self._search_parallel(prefix, suffix, difficulty)
+            elapsed = time.perf_counter() - start
+            self.last_stats = {
+                "nonce": nonce,
+                "difficulty": difficulty,
+                "workers": self.workers,
+                "hashes": hashes,
+                "seconds": elapsed,
+                "hashes_per_sec": hashes / elapsed if elapsed else 0.0,
+            }
+            return nonce
+
+    def _search_parallel(self, prefix: bytes, suffix: bytes, difficulty: int) -> Tuple[int, int]:
+        self._ensure_pool()
+        self._stop_event.clear()
+        futures = [
+            self._executor.submit(_search, prefix, suffix, difficulty, i, self.workers, self.check_every)
+            for i in range(self.workers)
+        ]
+        # Wait for all workers; they exit soon after the first one sets the event
+        wait(futures)
+        self._stop_event.clear()
+
+        found = [f.result() for f in futures]
+        hashes = sum(h for _, h in found)
+        nonces = [n for n, _ in found if n is not None]
+        return min(nonces), hashes
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,15 +1,364 @@
+import copy
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
+from blockchain.schemas import BLOCKS, INDEXES, TRANSACTIONS, block_document, transaction_documents
 
-uri = "mongodb+srv://Monarch:<db_password>@cluster0.di6a7.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
+# Set MONGO_URI to point at the deployment, or to memory:// for an
+# in-process stand-in; the default is the shared cluster
+DEFAULT_MONGO_URI = "mongodb+srv://Monarch:<db_password>@cluster0.di6a7.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
 
-# Create a new client and connect to the server
-client = MongoClient(uri, server_api=ServerApi('1'))
+# MongoDB error code for a duplicate _id
+DUPLICATE_KEY = 11000
 
-# Send a ping to confirm a successful connection
-try:
-    client.admin.command('ping')
-    print("Pinged your deployment. You successfully connected to MongoDB!")
-except Exception as e:
-    print(e)
\ No newline at end of file
+_client = None
+_memory_database = None
+
+
+def get_client():
+    """Shared MongoClient, created on first use rather than at import"""
+    global _client
+    if _client is None:
+        from pymongo.mongo_client import MongoClient
+        from pymongo.server_api import ServerApi
+        _client = MongoClient(os.getenv("MONGO_URI", DEFAULT_MONGO_URI), server_api=ServerApi('1'))
+    return _client
+
+
+def get_database():
+    """The database named by MONGO_DB, or the in-memory stand-in for memory:// URIs"""
+    global _memory_database
+    if os.getenv("MONGO_URI", DEFAULT_MONGO_URI).startswith("memory://"):
+        if _memory_database is None:
+            _memory_database = InMemoryDatabase()
+        return _memory_database
+    return get_client()[os.getenv("MONGO_DB", "byteback")]
+
+
+def ping() -> bool:
+    """Send a ping to confirm a successful connection"""
+    try:
+        get_client().admin.command('ping')
+        print("Pinged your deployment. You successfully connected to MongoDB!")
+        return True
+    except Exception as e:
+        print(e)
+        return False
+
+
+class InMemoryBulkWriteError(Exception):
+    """Raised like pymongo's BulkWriteError, with the same `details` shape"""
+
+    def __init__(self, details: Dict):
+        super().__init__("batch op errors occurred")
+        self.details = details
+
+
+def _matches(document: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if value is None:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class InMemoryCollection:
+    """Stand-in for the parts of a pymongo collection used by MongoMirror"""
+
+    def __init__(self):
+        self.documents: Dict[object, Dict] = {}
+        self.indexes: List = []
+        # Values held by each unique index, enforced on insert like MongoDB does
+        self._unique: Dict[Tuple[str, ...], set] = {}
+        self._lock = threading.Lock()
+
+    def create_index(self, keys, **options):
+        self.indexes.append((keys, options))
+        fields = tuple(field for field, _ in keys)
+        if options.get("unique") and fields not in self._unique:
+            with self._lock:
+                self._unique[fields] = {self._key(d, fields) for d in self.documents.values()}
+
+    @staticmethod
+    def _key(document: Dict, fields: Tuple[str, ...]) -> Tuple:
+        return tuple(document.get(field) for field in fields)
+
+    def _duplicate_key(self, document: Dict) -> Optional[Tuple[str, ...]]:
+        if document["_id"] in self.documents:
+            return ("_id",)
+        for fields, values in self._unique.items():
+            if self._key(document, fields) in values:
+                return fields
+        return None
+
+    def insert_many(self, documents: List[Dict], ordered: bool = True):
+        errors = []
+        with self._lock:
+            for position, document in enumerate(documents):
+                fields = self._duplicate_key(document)
+                if fields is not None:
+                    errors.append({
+                        "index": position, "code": DUPLICATE_KEY,
+                        "keyPattern": {field: 1 for field in fields},
+                        "keyValue": {field: document.get(field) for field in fields},
+                        "op": document,
+                    })
+                    if ordered:
+                        break
+                    continue
+                self.documents[document["_id"]] = copy.deepcopy(document)
+                for fields, values in self._unique.items():
+                    values.add(self._key(document, fields))
+        if errors:
+            raise InMemoryBulkWriteError({"writeErrors": errors})
+
+    def delete_many(self, query: Dict):
+        with self._lock:
+            for key in [k for k, document in self.documents.items() if _matches(document, query)]:
+                document = self.documents.pop(key)
+                for fields, values in self._unique.items():
+                    values.discard(self._key(document, fields))
+
+    def find(self, query: Optional[Dict] = None, sort=None, limit: int = 0) -> List[Dict]:
+        with self._lock:
+            found = [copy.deepcopy(d) for d in self.documents.values() if _matches(d, query or {})]
+        for field, direction in reversed(sort or []):
+            found.sort(key=lambda document: document.get(field), reverse=direction < 0)
+        return found[:limit] if limit else found
+
+    def find_one(self, query: Optional[Dict] = None, sort=None) -> Optional[Dict]:
+        found = self.find(query, sort, limit=1)
+        return found[0] if found else None
+
+    def count_documents(self, query: Dict) -> int:
+        return len(self.find(query))
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        return self._collections.setdefault(name, InMemoryCollection())
+
+
+class MongoMirror:
+    """Copies sealed RecycleChain blocks and their transactions into MongoDB.
+
+    The chain's hooks only queue work, so sealing a block never waits on
+    MongoDB. A background thread writes queued blocks with one insert_many
+    per collection, every batch_size blocks or flush_interval seconds, and
+    retries failed writes. When the queue is full, blocks are dropped and
+    counted; start() resumes from the first block missing from the mirror,
+    so they are copied again by the backfill on the next start.
+    """
+
+    def __init__(self, database, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_queue: int = 10_000, retry_interval: float = 5.0):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.mirrored_blocks = 0
+        self.mirrored_transactions = 0
+        self.dropped = 0
+        self.failed_writes = 0
+        self.backfilling = False
+
+    def start(self, chain):
+        """Follow the chain and start the writer thread.
+
+        Returns right away: the writer creates the indexes and copies the
+        blocks not mirrored yet before it applies queued blocks, retrying
+        while MongoDB is unreachable.
+        """
+        self._chain = chain
+        self._transaction_hash = chain.transaction_hash
+        # Follow the chain before the backfill reads its length so a block
+        # sealed meanwhile is not missed; a block written twice is skipped
+        chain.block_sealed_hooks.append(self.block_sealed)
+        chain.chain_truncated_hooks.append(self.chain_truncated)
+        self._thread = threading.Thread(target=self._run, name="mongo-mirror", daemon=True)
+        self._thread.start()
+
+    def _prepare(self) -> int:
+        """Create the indexes and find where the backfill resumes"""
+        for collection, keys, options in INDEXES:
+            self.database[collection].create_index(keys, **options)
+
+        # Resume at the first block that is missing or no longer on our chain;
+        # everything mirrored after it (dropped blocks leave gaps) is rewritten
+        resume = 0
+        for document in self.database[BLOCKS].find({}, sort=[("index", 1)]):
+            if (document["index"] != resume + 1 or resume >= len(self._chain.block_hashes)
+                    or self._chain.block_hashes[resume] != document["_id"]):
+                break
+            resume += 1
+        return resume
+
+    def _backfill(self):
+        """Copy the blocks sealed before start() that are not mirrored yet"""
+        self.backfilling = True
+        resume = self._retry(self._prepare)
+        if resume is None:
+            self.backfilling = False
+            return
+        self._retry(self._truncate, resume)
+        position = resume
+        while True:
+            # Read under the chain's lock so a fork cannot pair a block with another's hash
+            with self._chain._lock:
+                end = min(position + self.batch_size, len(self._chain.chain))
+                blocks = [(self._chain.chain[p], self._chain.block_hashes[p]) for p in range(position, end)]
+            if not blocks:
+                break
+            self._write_blocks(blocks)
+            position = end
+        self.backfilling = False
+
+    def block_sealed(self, block: Dict, block_hash: str):
+        self._enqueue(("block", block, block_hash))
+
+    def chain_truncated(self, length: int):
+        """Forget mirrored blocks from position `length` on, e.g. after a fork"""
+        self._enqueue(("truncate", length))
+
+    def _enqueue(self, operation):
+        try:
+            self._queue.put_nowait(operation)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        self._backfill()
+        while True:
+            operation = self._queue.get()
+            if operation is None:
+                return
+            # Gather more blocks until the batch is full or the interval is up
+            batch = [operation]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    operation = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if operation is None:
+                    self._apply(batch)
+                    return
+                batch.append(operation)
+            self._apply(batch)
+
+    def _apply(self, batch: List):
+        """Write runs of blocks in bulk, applying truncations in order between them"""
+        blocks = []
+        for operation in batch:
+            if operation[0] == "block":
+                blocks.append(operation[1:])
+                continue
+            self._write_blocks(blocks)
+            blocks = []
+            self._retry(self._truncate, operation[1])
+        self._write_blocks(blocks)
+
+    def _truncate(self, length: int):
+        # Block indexes start at 1, so position `length` holds index length + 1
+        self.database[BLOCKS].delete_many({"index": {"$gte": length + 1}})
+        self.database[TRANSACTIONS].delete_many({"block_index": {"$gte": length + 1}})
+
+    def _write_blocks(self, blocks: List):
+        if not blocks:
+            return
+        block_documents = [block_document(block, block_hash) for block, block_hash in blocks]
+        transactions = []
+        for block, block_hash in blocks:
+            hashes = [self._transaction_hash(transaction) for transaction in block["transactions"]]
+            transactions.extend(transaction_documents(block, block_hash, hashes))
+
+        self._retry(self._write, block_documents, transactions)
+        self.mirrored_blocks += len(block_documents)
+        self.mirrored_transactions += len(transactions)
+
+    def _write(self, block_documents: List[Dict], transactions: List[Dict]):
+        # A mirrored block with another hash at one of these indexes means a
+        # truncate was dropped; remove the stale blocks before writing ours
+        expected = {document["index"]: document["_id"] for document in block_documents}
+        existing = self.database[BLOCKS].find({"index": {"$gte": min(expected), "$lt": max(expected) + 1}})
+        stale = [document["index"] for document in existing
+                 if expected.get(document["index"], document["_id"]) != document["_id"]]
+        if stale:
+            self._truncate(min(stale) - 1)
+
+        self._insert(TRANSACTIONS, transactions)
+        # Blocks last, so a mirrored block implies its transactions are mirrored too
+        self._insert(BLOCKS, block_documents)
+
+    @staticmethod
+    def _same_document(error: Dict) -> bool:
+        """Whether a duplicate key error is on _id, i.e. the document is already mirrored"""
+        key = error.get("keyPattern") or error.get("keyValue")
+        if key:
+            return list(key) == ["_id"]
+        return "index: _id_ " in error.get("errmsg", "")
+
+    def _insert(self, collection: str, documents: List[Dict]):
+        if not documents:
+            return
+        try:
+            self.database[collection].insert_many(documents, ordered=False)
+        except Exception as e:
+            # Documents mirrored before (e.g. by an interrupted run) are skipped;
+            # a clash on any other unique key is a real conflict
+            errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if not errors or any(error.get("code") != DUPLICATE_KEY or not self._same_document(error)
+                                 for error in errors):
+                raise
+
+    def _retry(self, write, *args):
+        while True:
+            try:
+                return write(*args)
+            except Exception as e:
+                self.failed_writes += 1
+                print(f"MongoDB mirror write failed: {e!r}")
+                # Waits out the retry interval unless stop() is called meanwhile
+                if self._stopping.wait(self.retry_interval):
+                    return
+
+    def stop(self, timeout: float = 10.0):
+        """Write everything still queued, then stop the writer thread"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "backfilling": self.backfilling,
+            "mirrored_blocks": self.mirrored_blocks,
+            "mirrored_transactions": self.mirrored_transactions,
+            "dropped": self.dropped,
+            "failed_writes": self.failed_writes,
+        }
+
+
+# Usage: python -m blockchain.mongo_db
+if __name__ == "__main__":
+    ping()
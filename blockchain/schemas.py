@@ -0,0 +1,43 @@
+from typing import Dict, List
+
+# MongoDB documents mirroring RecycleChain. Blocks are keyed by their hash
+# and transactions by their hash (RecycleChain.transaction_hash), so writing
+# the same block twice is a no-op.
+
+BLOCKS = "blocks"
+TRANSACTIONS = "transactions"
+
+# (collection, keys, options) created by the mirror on start-up
+INDEXES = [
+    (BLOCKS, [("index", 1)], {"unique": True}),
+    (TRANSACTIONS, [("block_index", 1)], {}),
+    (TRANSACTIONS, [("sender", 1), ("block_index", -1)], {}),
+    (TRANSACTIONS, [("recipient", 1), ("block_index", -1)], {}),
+]
+
+
+def block_document(block: Dict, block_hash: str) -> Dict:
+    """A block header as stored in the blocks collection"""
+    return {
+        "_id": block_hash,
+        "index": block["index"],
+        "timestamp": block["timestamp"],
+        "merkle_root": block["merkle_root"],
+        "transaction_count": block["transaction_count"],
+        "proof": block["proof"],
+        "previous_hash": block["previous_hash"],
+    }
+
+
+def transaction_documents(block: Dict, block_hash: str, transaction_hashes: List[str]) -> List[Dict]:
+    """The transactions of a block as stored in the transactions collection"""
+    return [
+        {
+            **transaction,
+            "_id": transaction_hash,
+            "block_index": block["index"],
+            "block_hash": block_hash,
+            "offset": offset,
+        }
+        for offset, (transaction, transaction_hash) in enumerate(zip(block["transactions"], transaction_hashes))
+    ]
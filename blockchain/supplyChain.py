@@ -1,7 +1,12 @@
 import hashlib
-import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from blockchain.encoding import encode_fields
+from blockchain.mining import ParallelMiner
+
 
 class Block:
     def __init__(self, timestamp, product_data, previous_hash=""):
@@ -17,39 +22,72 @@ class Block:
         self.counter = 0  # Counter used for Proof of Work (mining).
         self.hash = self.calculate_hash()
 
+    def encoded_prefix(self):
+        """
+        Canonical bytes of everything hashed except the counter.
+        :return: The encoded timestamp, product data and previous hash.
+        """
+        return encode_fields(self.timestamp, self.product_data, self.previous_hash)
+
     def calculate_hash(self):
         """
         Calculate the hash of the block.
         :return: The SHA-256 hash of the block's data.
         """
-        block_string = (
-            str(self.timestamp)
-            + json.dumps(self.product_data)
-            + self.previous_hash
-            + str(self.counter)
-        )
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        return hashlib.sha256(self.encoded_prefix() + str(self.counter).encode()).hexdigest()
 
-    def mine_block(self, complexity):
+    def mine_block(self, complexity, miner=None):
         """
         Perform Proof of Work to find a hash that meets the complexity requirement.
+        The block data is encoded once; only the counter changes per attempt.
         :param complexity: The number of leading zeroes required in the hash.
+        :param miner: ParallelMiner spreading the search over processes (default: this process only).
         """
-        target = "0" * complexity
-        while self.hash[:complexity] != target:
-            self.counter += 1
-            self.hash = self.calculate_hash()
+        miner = miner or ParallelMiner(workers=1)
+        self.counter = miner.search(self.encoded_prefix(), b"", complexity)
+        self.hash = self.calculate_hash()
         print(f"Block mined: {self.hash}")
 
 
+def _valid_segment(blocks, previous_hash):
+    """
+    Check the hashes and links of consecutive blocks (run in worker processes).
+    :param blocks: Blocks to check, in chain order.
+    :param previous_hash: Hash of the block before the first one.
+    :return: True if every block is intact and linked to the one before it.
+    """
+    for block in blocks:
+        if block.hash != block.calculate_hash():
+            return False
+        if block.previous_hash != previous_hash:
+            return False
+        previous_hash = block.hash
+    return True
+
+
 class SupplyChain:
-    def __init__(self):
+    def __init__(self, mining_workers=1):
         """
         Initialize the supply chain blockchain.
+        :param mining_workers: Processes used to mine each block. The default of one
+            searches in this process; at the default complexity a block takes a few
+            hundred hashes, less than it costs to coordinate worker processes.
         """
         self.chain = [self.create_genesis_block()]
         self.complexity = 2  # Difficulty level for mining.
         self.pending_records = []
+        self.miner = ParallelMiner(workers=mining_workers)
+        # Process pool for is_chain_valid, started on first use and kept until close()
+        self._validation_pool = None
+        self._validation_workers = 0
+        # Where each product's records are, as (block index, record offset) in
+        # chain order, its latest record, and the products last seen at each
+        # location; built from the blocks not yet indexed
+        self.product_records = {}
+        self.latest_records = {}
+        self.products_by_location = {}
+        self._indexed_upto = 0
+        self._index_blocks()
 
     def create_genesis_block(self):
         """
@@ -90,28 +128,113 @@ class SupplyChain:
         new_block = Block(
             datetime.now(), self.pending_records, self.get_latest_block().hash
         )
-        new_block.mine_block(self.complexity)
+        new_block.mine_block(self.complexity, self.miner)
 
         # Add the new block to the chain and clear pending records.
         self.chain.append(new_block)
         self.pending_records = []
+        self._index_blocks()
+
+    @staticmethod
+    def _block_records(block):
+        """
+        The product records of a block.
+        :return: The genesis block's single record, or a mined block's list of records.
+        """
+        return [block.product_data] if isinstance(block.product_data, dict) else block.product_data
+
+    def _index_blocks(self):
+        """
+        Index the product records of blocks added since the last call.
+        """
+        for block_index in range(self._indexed_upto, len(self.chain)):
+            for offset, record in enumerate(self._block_records(self.chain[block_index])):
+                product_id = record.get("product_id")
+                if product_id is None:
+                    continue
+                self.product_records.setdefault(product_id, []).append((block_index, offset))
+
+                previous = self.latest_records.get(product_id)
+                if previous is not None and "location" in previous:
+                    self.products_by_location[previous["location"]].discard(product_id)
+                if "location" in record:
+                    self.products_by_location.setdefault(record["location"], set()).add(product_id)
+                self.latest_records[product_id] = record
+        self._indexed_upto = len(self.chain)
 
-    def is_chain_valid(self):
+    def history(self, product_id):
+        """
+        Every recorded stage of a product.
+        :param product_id: The product to look up.
+        :return: Its records in chain order, each with the index of its block.
+        """
+        self._index_blocks()
+        return [
+            {**self._block_records(self.chain[block_index])[offset], "block_index": block_index}
+            for block_index, offset in self.product_records.get(product_id, [])
+        ]
+
+    def current_status(self, product_id):
+        """
+        The most recent record of a product.
+        :param product_id: The product to look up.
+        :return: Its latest record, or None if it has never been mined into a block.
+        """
+        self._index_blocks()
+        return self.latest_records.get(product_id)
+
+    def products_at(self, location):
+        """
+        Products whose latest record places them at a location.
+        :param location: The location to look up.
+        :return: A sorted list of product IDs.
+        """
+        self._index_blocks()
+        return sorted(self.products_by_location.get(location, ()))
+
+    def is_chain_valid(self, workers=None, chunk_size=5000):
         """
         Check if the blockchain is valid by verifying hashes and links.
+        Long chains are split into chunks that are checked in parallel processes.
+        :param workers: Processes to use (default: one per CPU).
+        :param chunk_size: Blocks per chunk; chains no longer than this are checked in this process.
         :return: True if the chain is valid, False otherwise.
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
+        if len(self.chain) < 2:
+            return True
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(self.chain) <= chunk_size + 1:
+            return _valid_segment(self.chain[1:], self.chain[0].hash)
 
-            if current_block.hash != current_block.calculate_hash():
-                return False
+        # Each chunk also gets the hash of the block before it, so links across
+        # chunk boundaries are checked too
+        segments = [
+            (self.chain[start:start + chunk_size], self.chain[start - 1].hash)
+            for start in range(1, len(self.chain), chunk_size)
+        ]
+        return all(self._validation_executor(workers).map(_valid_segment, *zip(*segments)))
 
-            if current_block.previous_hash != previous_block.hash:
-                return False
+    def _validation_executor(self, workers):
+        """
+        The validation process pool, (re)started only when the worker count changes.
+        :param workers: Processes the pool should have.
+        """
+        if self._validation_pool is None or self._validation_workers != workers:
+            if self._validation_pool is not None:
+                self._validation_pool.shutdown()
+            context = multiprocessing.get_context("spawn")
+            self._validation_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            self._validation_workers = workers
+        return self._validation_pool
 
-        return True
+    def close(self):
+        """
+        Stop the mining and validation worker processes.
+        """
+        self.miner.shutdown()
+        if self._validation_pool is not None:
+            self._validation_pool.shutdown()
+            self._validation_pool = None
 
     def display_chain(self):
         """
@@ -128,31 +251,38 @@ class SupplyChain:
 
 
 # Example: Using the Supply Chain Blockchain
-supply_chain = SupplyChain()
+# Usage: python -m blockchain.supplyChain
+if __name__ == "__main__":
+    supply_chain = SupplyChain()
+
+    # Add product stages to the supply chain
+    supply_chain.add_record(
+        {"product_id": "12345", "status": "Manufactured", "location": "Factory A"}
+    )
+    supply_chain.mine_pending_records()
+    supply_chain.add_record(
+        {"product_id": "12345", "status": "Shipped", "location": "Warehouse B"}
+    )
 
-# Add product stages to the supply chain
-supply_chain.add_record(
-    {"product_id": "12345", "status": "Manufactured", "location": "Factory A"}
-)
-supply_chain.mine_pending_records()
-supply_chain.add_record(
-    {"product_id": "12345", "status": "Shipped", "location": "Warehouse B"}
-)
+    # Mine the pending records into a block
+    supply_chain.mine_pending_records()
 
-# Mine the pending records into a block
-supply_chain.mine_pending_records()
+    # Add another stage
+    supply_chain.add_record(
+        {"product_id": "12345", "status": "Delivered", "location": "Retail Store C"}
+    )
 
-# Add another stage
-supply_chain.add_record(
-    {"product_id": "12345", "status": "Delivered", "location": "Retail Store C"}
-)
+    # Mine the new stage
+    supply_chain.mine_pending_records()
 
-# Mine the new stage
-supply_chain.mine_pending_records()
+    print("\nStages of product 12345:", supply_chain.history("12345"))
+    print("Current status:", supply_chain.current_status("12345"))
+    print("Products at Retail Store C:", supply_chain.products_at("Retail Store C"))
 
 
-print("\nIs the chain valid?", supply_chain.is_chain_valid())
+    print("\nIs the chain valid?", supply_chain.is_chain_valid())
 
 
-print("\nBlockchain Data:")
-supply_chain.display_chain()
+    print("\nBlockchain Data:")
+    supply_chain.display_chain()
+    supply_chain.close()